@@ -113,9 +113,9 @@ class DeviceTester:
         Waits for and returns a response from the device.
         This can handle single-byte ACKs or multi-byte JSON responses.
         """
-        start_time = time.time()
+        start_time = time.monotonic()
         response_data = bytearray()
-        while time.time() - start_time < timeout:
+        while time.monotonic() - start_time < timeout:
             if self.ser.in_waiting > 0:
                 response_data.extend(self.ser.read(self.ser.in_waiting))
                 # If it's a potential JSON, wait a bit longer for more data
@@ -18,9 +18,9 @@ def send_command(ser, command_str):
 
 def read_line(ser, timeout_s=5):
     """Reads a single line from serial with a timeout."""
-    start_time = time.time()
+    start_time = time.monotonic()
     buffer = b""
-    while time.time() - start_time < timeout_s:
+    while time.monotonic() - start_time < timeout_s:
         if ser.in_waiting > 0:
             byte = ser.read(1)
             buffer += byte
@@ -38,10 +38,10 @@ def read_json_response(ser, timeout_s=15):
     This function ignores common debug messages from the Arduino.
     """
     json_str_buffer = ""
-    start_time = time.time()
+    start_time = time.monotonic()
     debug_prefixes = ["CMD:", "->", "OK:", "ERR:", "Serial ready"]
 
-    while time.time() - start_time < timeout_s:
+    while time.monotonic() - start_time < timeout_s:
         if ser.in_waiting > 0:
             line = ser.readline().decode("utf-8", errors="ignore").strip()
             print(f"[RECV] Line: '{line}'")
@@ -64,8 +64,8 @@ def read_json_response(ser, timeout_s=15):
 def wait_for_ack(ser, timeout_s=5):
     """Waits for an ACK or relevant 'OK' message from the Arduino."""
     print("[RECV] Waiting for ACK...")
-    start_time = time.time()
-    while time.time() - start_time < timeout_s:
+    start_time = time.monotonic()
+    while time.monotonic() - start_time < timeout_s:
         if ser.in_waiting > 0:
             line = ser.readline().decode("utf-8", errors="ignore").strip()
             print(f"[RECV] Line: '{line}'")
@@ -192,7 +192,6 @@ def upload_configuration(ser, segments_to_send):
             print(f"Error: Failed to receive ACK for segment {i+1}. Aborting.")
             return False
         print(f"Successfully sent segment {i+1}.")
-        time.sleep(0.1)
 
     print("\n--- Configuration successfully uploaded! ---")
     return True
@@ -8,17 +8,41 @@ dynamic parameter testing for all lighting effects.
 """
 
 import argparse
+import functools
+import io
+import itertools
 import json
 import os
+import re
+import selectors
 import serial
 import sys
 import time
-from typing import Any, Dict, Optional
+from collections import deque
+from serial.tools import list_ports
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import orjson  # Optional C-accelerated JSON codec
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Optional incremental JSON parser (pip install ijson)
+except ImportError:
+    ijson = None
 
 # --- Constants ---
 BAUD_RATE = 115200
 SERIAL_TIMEOUT = 0.5
+READ_IDLE_TIMEOUT = 0.05  # Silence on the line that marks the end of a response
 RESTART_DELAY = 6
+PORT_POLL_INTERVAL = 0.1
+PORT_SETTLE_DELAY = 0.2  # Grace period after the port node reappears
+RECONNECT_ATTEMPTS = 4
+RECONNECT_BACKOFF = 0.5  # First retry delay, doubled after each failed attempt
+PIPELINE_MIN_BATCH = 2  # Commands per write when a CommandPipeline starts or backs off
+PIPELINE_MAX_BATCH = 32
 DEFAULT_LED_COUNT = 45
 DEVICE_READY_MSG = "Setup complete. Entering main loop..."
 
@@ -38,6 +62,32 @@ CMD_ACK = 0xA0
 CMD_SET_LED_COUNT = 0x0C
 CMD_GET_LED_COUNT = 0x0D
 
+# Pre-built payloads for the binary commands that take no variable arguments
+BIN_ACK = bytes([CMD_ACK])
+BIN_GET_STATUS = bytes([CMD_GET_STATUS])
+BIN_CLEAR_SEGMENTS = bytes([CMD_CLEAR_SEGMENTS])
+BIN_GET_LED_COUNT = bytes([CMD_GET_LED_COUNT])
+BIN_BATCH_CONFIG = bytes([CMD_BATCH_CONFIG])
+BIN_SELECT_SEGMENT_1 = bytes([CMD_SELECT_SEGMENT, 1])
+
+# Wire bytes for the fixed ASCII commands issued throughout the suite
+B_GETSTATUS = b"getstatus\n"
+B_GETLEDCOUNT = b"getledcount\n"
+B_LISTEFFECTS = b"listeffects\n"
+B_CLEARSEGMENTS = b"clearsegments\n"
+
+# pyserial only exposes a selectable file descriptor for ports on POSIX
+_SELECTABLE_PORTS = sys.platform != "win32"
+
+# Start of the first JSON object or array in a response
+_JSON_START = re.compile(r"[\{\[]")
+
+# --- Discovery Cache ---
+# Effect names and parameter schemas are fixed for a given firmware build, so
+# they are queried once per run and shared across test functions.
+_effect_names: List[str] = []
+_effect_schemas: Dict[str, List[Dict[str, Any]]] = {}
+
 
 class TestError(Exception):
     """Custom exception for test failures."""
@@ -50,52 +100,156 @@ class TestError(Exception):
 
 def parse_json_from_response(response: str) -> Dict[str, Any]:
     """Finds and parses a JSON object from a serial response string."""
-    start_brace = response.find("{")
-    start_bracket = response.find("[")
-
-    if start_brace == -1 and start_bracket == -1:
+    match = _JSON_START.search(response)
+    if not match:
         raise TestError(f"No JSON object or array found in response: '{response}'")
 
-    start_pos = min(p for p in [start_brace, start_bracket] if p != -1)
-
+    start_pos = match.start()
     try:
-        return json.loads(response[start_pos:])
+        return json_loads(response[start_pos:] if start_pos else response)
     except json.JSONDecodeError as e:
         raise TestError(
             f"Failed to parse JSON from response: '{response[start_pos:]}'. Error: {e}"
         )
 
 
+def json_loads(data: Any) -> Any:
+    """Parses JSON from str or bytes, using orjson when it is installed."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps_compact(obj: Any) -> str:
+    """Serializes to JSON without whitespace, using orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_command(command: str) -> bytes:
+    """Returns the newline-terminated wire bytes for a command string."""
+    return (command + "\n").encode()
+
+
+@functools.lru_cache(maxsize=256)
+def _hex_frame(payload: bytes) -> bytes:
+    """Returns the '0x<hex>' line the firmware's serial parser expects for a binary command."""
+    return b"0x" + payload.hex().encode() + b"\n"
+
+
+def _walk_json_path(obj: Any, keys: List[str]) -> Iterator[Any]:
+    """Yields the values at an ijson-style path in an already parsed document."""
+    if not keys:
+        yield obj
+        return
+    key, rest = keys[0], keys[1:]
+    if key == "item":
+        if isinstance(obj, list):
+            for value in obj:
+                yield from _walk_json_path(value, rest)
+    elif isinstance(obj, dict) and key in obj:
+        yield from _walk_json_path(obj[key], rest)
+
+
+def json_items(response: str, path: str) -> Iterator[Any]:
+    """
+    Yields the values at an ijson-style dotted path (e.g. "led_count" or
+    "segments.item") in the JSON contained in a response. With ijson installed
+    the document is streamed, so callers that stop early never parse the rest.
+    """
+    if ijson is None:
+        yield from _walk_json_path(parse_json_from_response(response), path.split("."))
+        return
+
+    match = _JSON_START.search(response)
+    if not match:
+        raise TestError(f"No JSON object or array found in response: '{response}'")
+    stream = io.BytesIO(response[match.start() :].encode())
+    try:
+        yield from ijson.items(stream, path, use_float=True)
+    except ijson.JSONError as e:
+        raise TestError(
+            f"Failed to parse JSON from response: '{response[match.start():]}'. Error: {e}"
+        )
+
+
+def json_field(response: str, path: str, index: int = 0) -> Any:
+    """Returns the index-th value at a path in a JSON response, or None."""
+    return next(itertools.islice(json_items(response, path), index, None), None)
+
+
+def json_count(response: str, path: str) -> int:
+    """Counts the values at a path (e.g. "segments.item") in a JSON response."""
+    return sum(1 for _ in json_items(response, path))
+
+
 def read_all(ser: serial.Serial) -> str:
-    """Reads all available data from the serial port with a timeout."""
-    data = b""
-    start_time = time.time()
-    while time.time() - start_time < SERIAL_TIMEOUT:
-        if ser.in_waiting > 0:
-            data += ser.read(ser.in_waiting)
-        time.sleep(0.01)
+    """
+    Reads a complete response from the serial port.
+
+    Blocks in the driver (up to the port timeout) for the first line, then keeps
+    draining until the line has been idle for READ_IDLE_TIMEOUT.
+    """
+    first_line = ser.read_until(b"\n", size=4096)
+    if not first_line:
+        return ""
+    data = bytearray(first_line)
+
+    if _SELECTABLE_PORTS:
+        _drain_with_selector(ser, data)
+    else:
+        _drain_with_timeout(ser, data)
     return data.decode("utf-8", errors="ignore").strip()
 
 
-def send_command(
-    ser: serial.Serial, command: str, quiet: bool = False, expect_response: bool = True
+def _drain_with_selector(ser: serial.Serial, data: bytearray) -> None:
+    """Appends incoming bytes, waiting in the kernel for each burst, until idle."""
+    with selectors.DefaultSelector() as selector:
+        selector.register(ser.fileno(), selectors.EVENT_READ)
+        while selector.select(timeout=READ_IDLE_TIMEOUT):
+            chunk = ser.read(ser.in_waiting)
+            if not chunk:
+                break  # Readable with nothing to read: the port went away
+            data.extend(chunk)
+
+
+def _drain_with_timeout(ser: serial.Serial, data: bytearray) -> None:
+    """Appends incoming bytes until idle, using a short port timeout (Windows)."""
+    port_timeout = ser.timeout
+    ser.timeout = READ_IDLE_TIMEOUT
+    try:
+        while True:
+            chunk = ser.read(ser.in_waiting or 1)
+            if not chunk:
+                break
+            data.extend(chunk)
+    finally:
+        ser.timeout = port_timeout
+
+
+def _exchange(
+    ser: serial.Serial,
+    wire: bytes,
+    prefix: str,
+    quiet: bool,
+    expect_response: bool,
+    settle: float,
 ) -> str:
-    """
-    Sends a command to the device and returns the response.
-    If expect_response is False, it returns immediately after sending.
-    """
-    prefix = "BINARY" if command.startswith("0x") else "ASCII"
+    """Writes pre-encoded command bytes and returns the response, raising on ERR."""
+    command = wire.decode("utf-8", errors="ignore").rstrip("\n")
     if not quiet:
         print(
             f">>> SEND ({prefix}): {command[:100]}{'...' if len(command) > 100 else ''}"
         )
 
-    ser.write((command + "\n").encode())
+    ser.write(wire)
+    ser.flush()
 
     if not expect_response:
         return ""
 
-    time.sleep(SERIAL_TIMEOUT)
+    if settle:
+        time.sleep(settle)
     response = read_all(ser)
 
     if not quiet:
@@ -107,33 +261,231 @@ def send_command(
     return response
 
 
+def send_command(
+    ser: serial.Serial,
+    command: Union[str, bytes],
+    quiet: bool = False,
+    expect_response: bool = True,
+    settle: float = 0,
+) -> str:
+    """
+    Sends a command to the device and returns the response.
+    The command is either a string or ready-made wire bytes such as B_GETSTATUS.
+    If expect_response is False, it returns immediately after sending.
+    A non-zero settle waits that long before reading, for commands that need
+    extra device-side time before their output is complete.
+    """
+    wire = command if isinstance(command, bytes) else _encode_command(command)
+    prefix = "BINARY" if wire.startswith(b"0x") else "ASCII"
+    return _exchange(ser, wire, prefix, quiet, expect_response, settle)
+
+
+def send_bin(
+    ser: serial.Serial,
+    payload: bytes,
+    quiet: bool = False,
+    expect_response: bool = True,
+) -> str:
+    """
+    Sends a binary command payload and returns the response.
+    Outside of a batch transfer the firmware reads the serial port line by
+    line, so the payload travels in the '0x<hex>' text framing, built
+    straight from the bytes rather than via an intermediate command string.
+    """
+    return _exchange(ser, _hex_frame(payload), "BINARY", quiet, expect_response, 0)
+
+
+def send_pipeline(ser: serial.Serial, commands: List[str]) -> List[str]:
+    """
+    Writes all commands back-to-back in one write, then reads one non-empty reply
+    line per command. Each line gets its own port-timeout wait, so a reply that
+    never arrives ends the read without penalising the ones before it.
+
+    Batching only pays off from two commands up; a single command skips the
+    join and encode and writes its cached wire bytes directly instead.
+    """
+    if len(commands) == 1:
+        ser.write(_encode_command(commands[0]))
+    else:
+        ser.write(("\n".join(commands) + "\n").encode())
+    ser.flush()
+    return _read_lines(ser, len(commands))
+
+
+def _read_lines(ser: serial.Serial, count: int) -> List[str]:
+    """Reads up to count non-empty lines, stopping early if a line times out."""
+    replies: List[str] = []
+    while len(replies) < count:
+        raw = ser.readline()
+        if not raw:
+            break  # Per-line timeout expired
+        line = raw.decode("utf-8", errors="ignore").strip()
+        if line:
+            replies.append(line)
+    return replies
+
+
+def send_batch(
+    ser: serial.Serial, commands: List[str], quiet: bool = False
+) -> List[str]:
+    """
+    Sends several commands in a single write and returns one reply per command.
+    The firmware handles newline-separated commands in FIFO order, so replies
+    are matched to commands by position. Only use this for commands that
+    answer with exactly one line (OK/ERR messages or compact JSON). A batch of
+    one takes send_pipeline's single-command path.
+    """
+    if not quiet:
+        for command in commands:
+            print(
+                f">>> SEND (BATCH): {command[:100]}{'...' if len(command) > 100 else ''}"
+            )
+
+    replies = send_pipeline(ser, commands)
+
+    if not quiet:
+        print(f"<<< RECV (BATCH): {replies}\n" + "-" * 20)
+
+    if len(replies) < len(commands):
+        raise TestError(
+            f"Batch of {len(commands)} commands only got {len(replies)} replies: {replies}"
+        )
+    for command, reply in zip(commands, replies):
+        if "ERR" in reply:
+            raise TestError(f"Command '{command}' returned an error: {reply}")
+
+    return replies
+
+
+def send_plan(
+    ser: serial.Serial,
+    plan: List[Tuple[bytes, Callable[[str], bool], str]],
+    quiet: bool = False,
+) -> List[str]:
+    """
+    Runs an ordered plan of (wire bytes, check, failure message) entries in two
+    phases: every command is written in one burst, then the replies are read
+    back and checked in the same order. Like send_batch, this relies on the
+    firmware's FIFO command handling and single-line replies.
+    """
+    if not quiet:
+        for wire, _, _ in plan:
+            command = wire.decode("utf-8", errors="ignore").rstrip("\n")
+            print(
+                f">>> SEND (PLAN): {command[:100]}{'...' if len(command) > 100 else ''}"
+            )
+
+    # Submit
+    ser.write(b"".join(wire for wire, _, _ in plan))
+    ser.flush()
+
+    # Reap
+    replies = _read_lines(ser, len(plan))
+    if not quiet:
+        print(f"<<< RECV (PLAN): {replies}\n" + "-" * 20)
+
+    if len(replies) < len(plan):
+        raise TestError(
+            f"Plan of {len(plan)} commands only got {len(replies)} replies: {replies}"
+        )
+    for (wire, check, message), reply in zip(plan, replies):
+        if "ERR" in reply:
+            raise TestError(f"Command {wire!r} returned an error: {reply}")
+        assert check(reply), f"{message} Got: {reply}"
+
+    return replies
+
+
+class CommandPipeline:
+    """
+    Queues single-line-reply commands and sends them in adaptively sized
+    batches. The batch size starts at PIPELINE_MIN_BATCH and doubles after
+    every batch that is answered in full, up to PIPELINE_MAX_BATCH. A batch
+    that runs into a reply timeout halves it, and the commands still
+    unanswered are sent again at the smaller size; only a batch of the
+    smallest size that gets no reply at all raises TestError.
+    """
+
+    def __init__(
+        self,
+        ser: serial.Serial,
+        min_batch: int = PIPELINE_MIN_BATCH,
+        max_batch: int = PIPELINE_MAX_BATCH,
+    ):
+        self.ser = ser
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.batch = min_batch
+        self._pending: Deque[str] = deque()
+
+    def submit(self, command: str) -> None:
+        """Queues a command to be sent on the next drain()."""
+        self._pending.append(command)
+
+    def drain(self) -> List[str]:
+        """Sends every queued command and returns their replies in order."""
+        replies: List[str] = []
+        while self._pending:
+            count = min(self.batch, len(self._pending))
+            commands = [self._pending.popleft() for _ in range(count)]
+            batch_replies = send_pipeline(self.ser, commands)
+
+            for command, reply in zip(commands, batch_replies):
+                if "ERR" in reply:
+                    self._pending.clear()
+                    raise TestError(f"Command '{command}' returned an error: {reply}")
+            replies.extend(batch_replies)
+
+            if len(batch_replies) < len(commands):
+                if not batch_replies and self.batch == self.min_batch:
+                    self._pending.clear()
+                    raise TestError(
+                        f"No replies to a batch of {len(commands)} commands, even at the smallest batch size"
+                    )
+                # Retry the unanswered commands (setters and queries, safe to
+                # repeat) at half the size, after dropping any late replies
+                unanswered = commands[len(batch_replies) :]
+                self._pending.extendleft(reversed(unanswered))
+                self.batch = max(self.min_batch, self.batch // 2)
+                self.ser.reset_input_buffer()
+                continue
+
+            self.batch = min(self.max_batch, self.batch * 2)
+        return replies
+
+
 # --- Test Utilities ---
 
 
 def wait_for_device_ready(ser: serial.Serial, timeout: int = 15) -> None:
     """Waits for the device to signal it's ready after a restart."""
     print("      Waiting for device to be ready...")
-    start_time = time.time()
-    buffer = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            new_data = ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            buffer += new_data
-            print(f"      Debug: Received: {repr(new_data)}")  # Debug output
-            if DEVICE_READY_MSG in buffer:
-                print("      Device is ready.")
-                ser.reset_input_buffer()
-                return
-            # Alternative ready signals
-            if "BLE Manager initialized" in buffer or "Advertising" in buffer:
-                print("      Device appears to be ready (BLE initialized).")
-                time.sleep(1)  # Give it a moment to fully initialize
-                ser.reset_input_buffer()
-                return
-        time.sleep(0.1)
+    ready_marker = DEVICE_READY_MSG.encode()
 
+    # read_until returns as soon as the banner arrives, or after the timeout.
+    port_timeout = ser.timeout
+    ser.timeout = timeout
+    try:
+        buffer = bytearray(ser.read_until(ready_marker, size=16384))
+    finally:
+        ser.timeout = port_timeout
+
+    if ready_marker in buffer:
+        print("      Device is ready.")
+        ser.reset_input_buffer()
+        return
+
+    # Alternative ready signals
+    buffer.extend(ser.read(ser.in_waiting))
+    if b"BLE Manager initialized" in buffer or b"Advertising" in buffer:
+        print("      Device appears to be ready (BLE initialized).")
+        time.sleep(1)  # Give it a moment to fully initialize
+        ser.reset_input_buffer()
+        return
+
+    text = buffer.decode("utf-8", errors="ignore")
     print(
-        f"      Warning: Timeout waiting for ready signal. Buffer contents: {repr(buffer)}"
+        f"      Warning: Timeout waiting for ready signal. Buffer contents: {repr(text)}"
     )
     # Try to proceed anyway - device might be ready but not sending expected message
     ser.reset_input_buffer()
@@ -141,7 +493,7 @@ def wait_for_device_ready(ser: serial.Serial, timeout: int = 15) -> None:
 
     # Test if device is responsive
     try:
-        test_response = send_command(ser, "getledcount", quiet=True)
+        test_response = send_command(ser, B_GETLEDCOUNT, quiet=True)
         if "LED_COUNT:" in test_response:
             print("      Device appears to be responsive.")
             return
@@ -153,8 +505,46 @@ def wait_for_device_ready(ser: serial.Serial, timeout: int = 15) -> None:
     )
 
 
+def _port_present(name: str) -> bool:
+    """Returns True if the OS currently lists a serial port with this device name."""
+    return any(p.device == name for p in list_ports.comports())
+
+
+def _wait_for_port(name: str, timeout: float = RESTART_DELAY * 2) -> bool:
+    """Polls the OS port list until the named port appears or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _port_present(name):
+            return True
+        time.sleep(PORT_POLL_INTERVAL)
+    return False
+
+
+def _reuse_open_port(ser: serial.Serial) -> bool:
+    """
+    Waits for the ready banner on the still-open port, for USB-serial adapters
+    whose tty node survives the device restart. Returns False if the port went
+    away (or never signalled ready), so the caller can reopen it instead.
+    """
+    if not (_SELECTABLE_PORTS and ser.is_open and _port_present(ser.port)):
+        return False
+    try:
+        ser.reset_input_buffer()
+        wait_for_device_ready(ser, timeout=RESTART_DELAY)
+        return True
+    except (OSError, serial.SerialException, TestError) as e:
+        print(f"      Open port not usable after restart ({e}); reopening.")
+        return False
+
+
 def restart_and_reconnect(ser: serial.Serial) -> None:
-    """Closes, waits, and reopens the serial port to reconnect after a device restart."""
+    """
+    Reconnects after a device restart, keeping the open port when it survives
+    the restart and otherwise closing, waiting for, and reopening it.
+    """
+    if _reuse_open_port(ser):
+        return
+
     port = ser.port
     baudrate = ser.baudrate
 
@@ -165,33 +555,36 @@ def restart_and_reconnect(ser: serial.Serial) -> None:
             # This can happen if the device disappears abruptly, which is expected.
             print(f"      Ignoring error while closing stale port: {e}")
 
-    print(
-        f"      Device restarting. Waiting {RESTART_DELAY}s for serial port to reappear..."
-    )
-    time.sleep(RESTART_DELAY)
-
-    # Try multiple times to reconnect
-    max_retries = 3
-    for attempt in range(max_retries):
+    print("      Device restarting. Waiting for serial port to reappear...")
+    # The old port node lingers until the device actually resets; give it a
+    # moment to drop off the bus so we don't reopen the pre-restart instance.
+    vanish_deadline = time.monotonic() + 1.0
+    while time.monotonic() < vanish_deadline and _port_present(port):
+        time.sleep(PORT_POLL_INTERVAL)
+    if not _wait_for_port(port):
+        print(f"      Port {port} did not reappear; attempting to reconnect anyway.")
+    time.sleep(PORT_SETTLE_DELAY)
+
+    # Retry with exponential backoff between attempts
+    backoff = RECONNECT_BACKOFF
+    for attempt in range(1, RECONNECT_ATTEMPTS + 1):
         try:
-            print(f"      Reconnection attempt {attempt + 1}/{max_retries}")
+            print(f"      Reconnection attempt {attempt}/{RECONNECT_ATTEMPTS}")
             ser.port = port
             ser.baudrate = baudrate
             ser.open()
-            time.sleep(2.0)  # Longer delay after opening to let the port stabilize
-            if ser.is_open:
-                print("      Serial port reconnected.")
-                wait_for_device_ready(ser)
-                return
+            print("      Serial port reconnected.")
+            wait_for_device_ready(ser)
+            return
         except serial.SerialException as e:
-            print(f"      Attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                print("      Waiting before retry...")
-                time.sleep(2)
-            else:
+            print(f"      Attempt {attempt} failed: {e}")
+            if attempt == RECONNECT_ATTEMPTS:
                 raise TestError(
-                    f"Failed to reconnect to the serial port after {max_retries} attempts. Final error: {e}"
+                    f"Failed to reconnect to the serial port after {RECONNECT_ATTEMPTS} attempts. Final error: {e}"
                 )
+            print(f"      Waiting {backoff:.1f}s before retry...")
+            time.sleep(backoff)
+            backoff *= 2
 
 
 def run_test(test_function, *args):
@@ -210,34 +603,93 @@ def run_test(test_function, *args):
         return False
 
 
+def _verify_param(
+    info_response: str, index: int, param_name: str, test_value: Any, cmd_value: Any
+) -> None:
+    """Checks a geteffectinfo reply for the value just set on a parameter."""
+    # The cached schema gives the parameter's position, so only fall back to a
+    # search if the layout differs.
+    params_after = parse_json_from_response(info_response).get("params", [])
+    param_after = (
+        params_after[index]
+        if index < len(params_after) and params_after[index]["name"] == param_name
+        else next((p for p in params_after if p["name"] == param_name), None)
+    )
+
+    assert param_after is not None, f"Parameter '{param_name}' not found after setting."
+    assert (
+        param_after["value"] == test_value
+    ), f"Verification failed for '{param_name}'. Sent {cmd_value}, got {param_after['value']}."
+
+
+def _confirm_visually(
+    ser: serial.Serial,
+    segment_id: int,
+    adjusted: List[Tuple[str, List[Tuple[str, Any]]]],
+) -> None:
+    """
+    Replays recorded (effect, [(param, value), ...]) changes and asks for a
+    visual confirmation of each. Answering 'a' accepts the rest of the
+    current effect's parameters, which are still applied without prompting.
+    """
+    print("\n--- Visual Confirmation ---")
+    for effect_name, changes in adjusted:
+        print(f"\n      Effect: {effect_name} ({len(changes)} parameters)")
+        # Re-selecting the effect restores its defaults, so each change is visible
+        send_command(ser, f"seteffect {segment_id} {effect_name}", quiet=True)
+        confirm_all = False
+        for param_name, cmd_value in changes:
+            send_command(
+                ser, f"setparam {segment_id} {param_name} {cmd_value}", quiet=True
+            )
+            if confirm_all:
+                continue
+            ans = (
+                input(
+                    f"      --> VISUAL CHECK: Did '{param_name}' change correctly? (y/n/a=all for {effect_name}): "
+                )
+                .strip()
+                .lower()
+            )
+            if ans == "a":
+                confirm_all = True
+            elif ans != "y":
+                raise TestError(
+                    f"Visual confirmation failed for '{param_name}' on {effect_name}."
+                )
+
+
 # --- Test Suites ---
 
 
 def test_all_serial_commands(ser: serial.Serial, json_config_path: str):
     """Provides full test coverage for the ASCII serial command interface."""
     # 1. Effect Discovery
-    response = send_command(ser, "listeffects")
+    response = send_command(ser, B_LISTEFFECTS)
     effect_list = parse_json_from_response(response).get("effects", [])
     assert len(effect_list) > 5, "listeffects should return a list of effects."
+    _effect_names[:] = effect_list
 
     # 2. Segment Management
-    send_command(ser, "clearsegments")
-    response = parse_json_from_response(send_command(ser, "getstatus"))
+    send_command(ser, B_CLEARSEGMENTS)
+    response = send_command(ser, B_GETSTATUS)
     assert (
-        len(response["segments"]) == 1
+        json_count(response, "segments.item") == 1
     ), "Should only have the 'all' segment after clearing."
 
     send_command(ser, "addsegment 10 20 seg_one")
     send_command(ser, "addsegment 21 30 seg_two")
-    response = parse_json_from_response(send_command(ser, "getstatus"))
-    assert len(response["segments"]) == 3, "Failed to add new segments."
+    response = send_command(ser, B_GETSTATUS)
+    assert json_count(response, "segments.item") == 3, "Failed to add new segments."
 
     # 3. Effect and Parameter Management
     test_effect = "SolidColor"
     test_seg_id = 1
     send_command(ser, f"seteffect {test_seg_id} {test_effect}")
-    status = parse_json_from_response(send_command(ser, "getstatus"))
-    assert status["segments"][test_seg_id]["effect"] == test_effect, "seteffect failed."
+    status = send_command(ser, B_GETSTATUS)
+    assert (
+        json_field(status, "segments.item.effect", test_seg_id) == test_effect
+    ), "seteffect failed."
 
     info = parse_json_from_response(send_command(ser, f"geteffectinfo {test_seg_id}"))
     assert info["effect"] == test_effect and "params" in info, "geteffectinfo failed."
@@ -257,15 +709,17 @@ def test_all_serial_commands(ser: serial.Serial, json_config_path: str):
         config_str
     ), "getconfig failed to return valid JSON."
 
-    with open(json_config_path, "r") as f:
-        compact_json = json.dumps(json.load(f), separators=(",", ":"))
+    with open(json_config_path, "rb") as f:
+        compact_json = json_dumps_compact(json_loads(f.read()))
     send_command(ser, f"batchconfig {compact_json}")
-    status = parse_json_from_response(send_command(ser, "getstatus"))
-    assert len(status["segments"]) >= 3, "batchconfig did not apply new segments."
+    status = send_command(ser, B_GETSTATUS)
+    assert (
+        json_count(status, "segments.item") >= 3
+    ), "batchconfig did not apply new segments."
 
     # 5. LED Count Management (ASCII)
-    current_led_count = status.get("led_count")
-    response = send_command(ser, "getledcount")
+    current_led_count = json_field(status, "led_count")
+    response = send_command(ser, B_GETLEDCOUNT)
     assert (
         f"LED_COUNT: {current_led_count}" in response
     ), f"getledcount failed. Expected {current_led_count}."
@@ -274,136 +728,145 @@ def test_all_serial_commands(ser: serial.Serial, json_config_path: str):
 def test_all_hex_commands(ser: serial.Serial):
     """Tests the full suite of hexadecimal commands."""
     # Setup: one main segment and one user segment
-    send_command(ser, "clearsegments", quiet=True)
+    send_command(ser, B_CLEARSEGMENTS, quiet=True)
     send_command(ser, "addsegment 10 20 user_seg", quiet=True)
-    status_before = parse_json_from_response(send_command(ser, "getstatus", quiet=True))
-    current_led_count = status_before.get("led_count")
+    current_led_count = json_field(
+        send_command(ser, B_GETSTATUS, quiet=True), "led_count"
+    )
 
-    # Test CMD_SET_BRIGHTNESS
     brightness = 150
-    cmd_bytes = bytes([CMD_SET_BRIGHTNESS, brightness])
-    response = send_command(ser, "0x" + cmd_bytes.hex())
-    assert (
-        f"OK: Brightness set to {brightness}" in response
-    ), "CMD_SET_BRIGHTNESS failed."
-
-    # Test CMD_SET_COLOR (on main segment)
     r, g, b = 255, 0, 255  # Magenta
-    cmd_bytes = bytes([CMD_SET_COLOR, r, g, b])
-    assert "OK: Color set" in send_command(
-        ser, "0x" + cmd_bytes.hex()
-    ), "CMD_SET_COLOR failed."
-
-    # Test CMD_SET_EFFECT (Fire, ID=5, on main segment)
     effect_id_fire = 5
-    cmd_bytes = bytes([CMD_SET_EFFECT, effect_id_fire])
-    assert "OK: Effect set to Fire" in send_command(
-        ser, "0x" + cmd_bytes.hex()
-    ), "CMD_SET_EFFECT failed."
-
-    # Test CMD_GET_EFFECT_INFO for the effect we just set
-    cmd_bytes = bytes([CMD_GET_EFFECT_INFO, 0])  # Check segment 0
-    response = send_command(ser, "0x" + cmd_bytes.hex())
-    info = parse_json_from_response(response)
-    assert (
-        info.get("effect") == "Fire" and "params" in info
-    ), "CMD_GET_EFFECT_INFO failed."
-
-    # Test CMD_SET_SEG_BRIGHT
     seg_id, seg_brightness = 1, 200
-    cmd_bytes = bytes([CMD_SET_SEG_BRIGHT, seg_id, seg_brightness])
-    response = send_command(ser, "0x" + cmd_bytes.hex())
-    assert (
-        f"OK: Segment {seg_id} brightness set to {seg_brightness}" in response
-    ), "CMD_SET_SEG_BRIGHT failed."
-
-    # Test CMD_SELECT_SEGMENT (no-op, just check for OK)
-    assert "OK: Segment selected" in send_command(
-        ser, "0x" + bytes([CMD_SELECT_SEGMENT, 1]).hex()
-    ), "CMD_SELECT_SEGMENT failed."
-
-    # Test CMD_SET_SEG_RANGE
-    seg_id, start, end = 1, 15, 25
-    cmd_bytes = bytes(
-        [
-            CMD_SET_SEG_RANGE,
-            seg_id,
-            (start >> 8) & 0xFF,
-            start & 0xFF,
-            (end >> 8) & 0xFF,
-            end & 0xFF,
-        ]
-    )
-    response = send_command(ser, "0x" + cmd_bytes.hex())
-    assert (
-        f"OK: Segment {seg_id} range set to {start}-{end}" in response
-    ), "CMD_SET_SEG_RANGE failed."
-
-    # Test CMD_GET_STATUS (Note: Binary command sends JSON via BLE, confirm via Serial log)
-    response = send_command(ser, "0x" + bytes([CMD_GET_STATUS]).hex())
-    assert (
-        "-> Sent Status JSON" in response
-    ), "CMD_GET_STATUS did not send JSON via BLE."
-
-    # Test CMD_CLEAR_SEGMENTS
-    assert "OK: User segments cleared" in send_command(
-        ser, "0x" + bytes([CMD_CLEAR_SEGMENTS]).hex()
-    ), "CMD_CLEAR_SEGMENTS failed."
-    # Verify segments were cleared using ASCII command (which returns JSON via Serial)
-    status = parse_json_from_response(send_command(ser, "getstatus"))
-    assert len(status["segments"]) == 1, "Segments were not cleared correctly."
-
-    # Test CMD_BATCH_CONFIG (verifies acknowledgment, as function is not implemented in FW)
-    assert "OK: Batch config (not implemented)" in send_command(
-        ser, "0x" + bytes([CMD_BATCH_CONFIG]).hex()
-    ), "CMD_BATCH_CONFIG failed."
-
-    # Test CMD_GET_LED_COUNT (Note: This sends binary response via BLE, but we can verify via Serial log)
-    response = send_command(ser, "0x" + bytes([CMD_GET_LED_COUNT]).hex())
-    # The binary command sends data via BLE, but prints confirmation to Serial
-    assert (
-        f"-> Sent LED Count: {current_led_count}" in response
-    ), f"CMD_GET_LED_COUNT failed. Expected confirmation of {current_led_count}."
-
-    # Test CMD_ACK
-    assert "OK: ACK" in send_command(
-        ser, "0x" + bytes([CMD_ACK]).hex()
-    ), "CMD_ACK failed."
+    start, end = 15, 25
+
+    # None of these commands depends on an earlier reply, so they are all
+    # submitted in one write and their replies reaped in order afterwards.
+    plan = [
+        (
+            _hex_frame(bytes([CMD_SET_BRIGHTNESS, brightness])),
+            lambda reply: f"OK: Brightness set to {brightness}" in reply,
+            "CMD_SET_BRIGHTNESS failed.",
+        ),
+        # CMD_SET_COLOR (on main segment)
+        (
+            _hex_frame(bytes([CMD_SET_COLOR, r, g, b])),
+            lambda reply: "OK: Color set" in reply,
+            "CMD_SET_COLOR failed.",
+        ),
+        # CMD_SET_EFFECT (Fire, ID=5, on main segment)
+        (
+            _hex_frame(bytes([CMD_SET_EFFECT, effect_id_fire])),
+            lambda reply: "OK: Effect set to Fire" in reply,
+            "CMD_SET_EFFECT failed.",
+        ),
+        # CMD_GET_EFFECT_INFO for the effect we just set on segment 0
+        (
+            _hex_frame(bytes([CMD_GET_EFFECT_INFO, 0])),
+            lambda reply: json_field(reply, "effect") == "Fire"
+            and json_count(reply, "params") == 1,
+            "CMD_GET_EFFECT_INFO failed.",
+        ),
+        (
+            _hex_frame(bytes([CMD_SET_SEG_BRIGHT, seg_id, seg_brightness])),
+            lambda reply: f"OK: Segment {seg_id} brightness set to {seg_brightness}"
+            in reply,
+            "CMD_SET_SEG_BRIGHT failed.",
+        ),
+        # CMD_SELECT_SEGMENT (no-op, just check for OK)
+        (
+            _hex_frame(BIN_SELECT_SEGMENT_1),
+            lambda reply: "OK: Segment selected" in reply,
+            "CMD_SELECT_SEGMENT failed.",
+        ),
+        (
+            _hex_frame(
+                bytes(
+                    [
+                        CMD_SET_SEG_RANGE,
+                        seg_id,
+                        (start >> 8) & 0xFF,
+                        start & 0xFF,
+                        (end >> 8) & 0xFF,
+                        end & 0xFF,
+                    ]
+                )
+            ),
+            lambda reply: f"OK: Segment {seg_id} range set to {start}-{end}" in reply,
+            "CMD_SET_SEG_RANGE failed.",
+        ),
+        # CMD_GET_STATUS (Note: Binary command sends JSON via BLE, confirm via Serial log)
+        (
+            _hex_frame(BIN_GET_STATUS),
+            lambda reply: "-> Sent Status JSON" in reply,
+            "CMD_GET_STATUS did not send JSON via BLE.",
+        ),
+        (
+            _hex_frame(BIN_CLEAR_SEGMENTS),
+            lambda reply: "OK: User segments cleared" in reply,
+            "CMD_CLEAR_SEGMENTS failed.",
+        ),
+        # Verify segments were cleared using ASCII command (which returns JSON via Serial)
+        (
+            B_GETSTATUS,
+            lambda reply: json_count(reply, "segments.item") == 1,
+            "Segments were not cleared correctly.",
+        ),
+        # CMD_BATCH_CONFIG (verifies acknowledgment, as function is not implemented in FW)
+        (
+            _hex_frame(BIN_BATCH_CONFIG),
+            lambda reply: "OK: Batch config (not implemented)" in reply,
+            "CMD_BATCH_CONFIG failed.",
+        ),
+        # CMD_GET_LED_COUNT (sends binary via BLE, but prints confirmation to Serial)
+        (
+            _hex_frame(BIN_GET_LED_COUNT),
+            lambda reply: f"-> Sent LED Count: {current_led_count}" in reply,
+            f"CMD_GET_LED_COUNT failed. Expected confirmation of {current_led_count}.",
+        ),
+        (
+            _hex_frame(BIN_ACK),
+            lambda reply: "OK: ACK" in reply,
+            "CMD_ACK failed.",
+        ),
+    ]
+    send_plan(ser, plan)
 
 
 def test_led_count_and_persistence(ser: serial.Serial):
     """Tests setting LED_COUNT, which triggers a restart and tests config persistence."""
     # 1. Set a unique configuration to test persistence
-    send_command(ser, "clearsegments", quiet=True)
+    send_command(ser, B_CLEARSEGMENTS, quiet=True)
     send_command(ser, "seteffect 0 ColoredFire", quiet=True)
-    send_command(ser, "saveconfig", quiet=True)
+    send_command(ser, "saveconfig", quiet=True, settle=SERIAL_TIMEOUT)
 
     # 2. Set new LED count via binary command, which forces a restart
-    initial_count = parse_json_from_response(
-        send_command(ser, "getstatus", quiet=True)
-    ).get("led_count")
+    initial_count = json_field(send_command(ser, B_GETSTATUS, quiet=True), "led_count")
     new_count = 30
-    cmd_bytes = bytes([CMD_SET_LED_COUNT, (new_count >> 8) & 0xFF, new_count & 0xFF])
-    send_command(ser, "0x" + cmd_bytes.hex(), expect_response=False)
+    send_bin(
+        ser,
+        bytes([CMD_SET_LED_COUNT, (new_count >> 8) & 0xFF, new_count & 0xFF]),
+        expect_response=False,
+    )
     restart_and_reconnect(ser)
 
     # 3. Verify the new LED count
-    response = send_command(ser, "getledcount", quiet=True)
+    response = send_command(ser, B_GETLEDCOUNT, quiet=True)
     verified_count = int(response.split(":")[1].strip())
     assert (
         verified_count == new_count
     ), f"Expected new count of {new_count}, but got {verified_count}."
 
     # 4. Verify that the configuration was restored after the restart
-    status = parse_json_from_response(send_command(ser, "getstatus", quiet=True))
+    status = send_command(ser, B_GETSTATUS, quiet=True)
     assert (
-        status["segments"][0]["effect"] == "ColoredFire"
+        json_field(status, "segments.item.effect") == "ColoredFire"
     ), "Configuration did not persist across restart."
 
     # 5. Restore original count via ASCII command for safety and restart again
     send_command(ser, f"setledcount {initial_count}", expect_response=False)
     restart_and_reconnect(ser)
-    response = send_command(ser, "getledcount", quiet=True)
+    response = send_command(ser, B_GETLEDCOUNT, quiet=True)
     final_count = int(response.split(":")[1].strip())
     assert final_count == initial_count, "Could not restore LED count to default."
 
@@ -411,33 +874,52 @@ def test_led_count_and_persistence(ser: serial.Serial):
 def test_all_parameters_for_all_effects(ser: serial.Serial, mode: str):
     """
     Discovers all effects, then discovers, adjusts, and verifies every parameter
-    of each effect, either automatically or with manual confirmation.
+    of each effect. In manual mode the verified changes are then replayed one
+    by one for visual confirmation.
     """
     print(f"      Mode: {mode.upper()}")
-    # 1. Discover all effects
-    response = send_command(ser, "listeffects")
-    effects_to_test = parse_json_from_response(response)["effects"]
+    # 1. Discover all effects (reusing an earlier listeffects if there was one)
+    if not _effect_names:
+        response = send_command(ser, B_LISTEFFECTS)
+        _effect_names[:] = parse_json_from_response(response)["effects"]
+    effects_to_test = _effect_names
     print(f"      Found {len(effects_to_test)} effects to test.")
 
     # 2. Prepare a clean segment for testing
-    send_command(ser, "clearsegments", quiet=True)
-    current_led_count = parse_json_from_response(
-        send_command(ser, "getstatus", quiet=True)
-    ).get("led_count")
+    send_command(ser, B_CLEARSEGMENTS, quiet=True)
+    current_led_count = json_field(
+        send_command(ser, B_GETSTATUS, quiet=True), "led_count"
+    )
     send_command(ser, f"addsegment 0 {current_led_count - 1} test_segment", quiet=True)
     segment_id = 1
+    pipeline = CommandPipeline(ser)
 
+    # 3. Adjust and verify every parameter automatically, recording each change
+    adjusted: List[Tuple[str, List[Tuple[str, Any]]]] = []
     for effect_name in effects_to_test:
         print(f"\n--- Testing Effect: {effect_name} ---")
-        send_command(ser, f"seteffect {segment_id} {effect_name}", quiet=True)
-        params_response = send_command(ser, f"geteffectinfo {segment_id}", quiet=True)
-        params_list = parse_json_from_response(params_response).get("params", [])
+        if effect_name in _effect_schemas:
+            send_command(ser, f"seteffect {segment_id} {effect_name}", quiet=True)
+        else:
+            _, params_response = send_batch(
+                ser,
+                [
+                    f"seteffect {segment_id} {effect_name}",
+                    f"geteffectinfo {segment_id}",
+                ],
+                quiet=True,
+            )
+            _effect_schemas[effect_name] = parse_json_from_response(
+                params_response
+            ).get("params", [])
+        params_list = _effect_schemas[effect_name]
 
         if not params_list:
             print("      No parameters to test for this effect.")
             continue
 
-        for param in params_list:
+        planned = []
+        for index, param in enumerate(params_list):
             param_name = param["name"]
             param_type = param["type"]
 
@@ -453,37 +935,22 @@ def test_all_parameters_for_all_effects(ser: serial.Serial, mode: str):
                 cmd_value = test_value
 
             print(f"      Adjusting param '{param_name}' to '{cmd_value}'...")
-            send_command(
-                ser, f"setparam {segment_id} {param_name} {cmd_value}", quiet=True
-            )
+            pipeline.submit(f"setparam {segment_id} {param_name} {cmd_value}")
+            pipeline.submit(f"geteffectinfo {segment_id}")
+            planned.append((index, param_name, test_value, cmd_value))
 
-            # Automatic verification
-            info_after = parse_json_from_response(
-                send_command(ser, f"geteffectinfo {segment_id}", quiet=True)
-            )
-            param_after = next(
-                (p for p in info_after.get("params", []) if p["name"] == param_name),
-                None,
-            )
+        # Every second reply is the geteffectinfo following a setparam
+        info_responses = pipeline.drain()[1::2]
+        for (index, param_name, test_value, cmd_value), info_response in zip(
+            planned, info_responses
+        ):
+            _verify_param(info_response, index, param_name, test_value, cmd_value)
+        adjusted.append((effect_name, [(name, value) for _, name, _, value in planned]))
 
-            assert (
-                param_after is not None
-            ), f"Parameter '{param_name}' not found after setting."
-            assert (
-                param_after["value"] == test_value
-            ), f"Verification failed for '{param_name}'. Sent {cmd_value}, got {param_after['value']}."
-
-            # Manual (visual) verification if in manual mode
-            if mode == "manual":
-                ans = (
-                    input(
-                        f"      --> VISUAL CHECK: Did '{param_name}' change correctly? (y/n): "
-                    )
-                    .strip()
-                    .lower()
-                )
-                if ans != "y":
-                    raise TestError(f"Visual confirmation failed for '{param_name}'.")
+    # 4. Manual (visual) verification replays the changes once everything has
+    # passed automatically, so the prompts never hold up the device sweep.
+    if mode == "manual":
+        _confirm_visually(ser, segment_id, adjusted)
 
 
 # --- Main Application ---
@@ -531,7 +998,7 @@ def main():
             print("Skipping device restart (--skip-init flag used)")
             # Just test if device is responsive
             try:
-                response = send_command(ser, "getledcount", quiet=True)
+                response = send_command(ser, B_GETLEDCOUNT, quiet=True)
                 if "LED_COUNT:" in response:
                     print("Device appears to be ready and responsive.")
                 else:
@@ -552,7 +1019,7 @@ def main():
                 )
                 # Try basic communication test
                 try:
-                    response = send_command(ser, "getledcount", quiet=True)
+                    response = send_command(ser, B_GETLEDCOUNT, quiet=True)
                     if "LED_COUNT:" in response:
                         print("Device appears to be responsive despite restart issues.")
                     else:
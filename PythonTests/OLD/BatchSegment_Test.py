@@ -2,143 +2,237 @@ import serial
 import json
 import time
 import sys
+import re
 import argparse
+import logging
+import logging.handlers
 import struct  # For converting integer to bytes
 import random  # For generating random-ish values for test data
 
+try:
+    import numpy as np  # Optional: bulk random draws for large parameter sets
+except ImportError:
+    np = None
+
+log = logging.getLogger(__name__)
+
+# A complete JSON string literal, escapes included
+JSON_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+# Big-endian unsigned 16-bit field, used for the segment count
+U16_BE = struct.Struct(">H")
+
+# One reusable encoder for the compact segment JSON sent to the Arduino
+_compact_json_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+# Lines wait_for_ack treats as an acknowledgement or a failure, each checked in
+# one regex pass instead of a chain of substring searches
+ACK_RE = re.compile(r"-> Sent ACK|OK: Segment|OK: All segment configurations received")
+ERR_RE = re.compile(r"ERR:|error")
+
+# Below this many random parameter values, per-value random.random beats NumPy setup
+NUMPY_MIN_DRAWS = 50
+
+# Debug records buffered by --verbose logging before they are written out
+LOG_BATCH_SIZE = 256
+
+# Common Arduino debug prefixes read_json_response ignores when building the
+# JSON buffer, as one tuple so str.startswith checks them all in a single call
+DEBUG_PREFIXES = (
+    "Serial RX (Raw):",
+    "Serial Command Received:",
+    "Serial Command:",
+    "CMD:",
+    "-> Sending",
+    "OK:",
+    "ERR:",
+    "BLE TX Failed:",
+    "Expected segments to receive:",
+    "Received segment JSON:",
+)
+
 # --- Helper Functions for Serial Communication ---
 
 
-def send_command(ser, command_str):
-    """Sends a command string to Arduino and prints debug info."""
-    print(f"\n[SEND] Command: '{command_str.strip()}'")
-    ser.write(command_str.encode("utf-8"))
-    print(
-        f"[SENT] ASCII: '{command_str.strip()}' | Bytes: {command_str.encode('utf-8').hex()}"
+def configure_logging(verbose):
+    """
+    Sets up log output. With verbose, the per-line DEBUG trace is buffered
+    and written in batches (or as soon as a warning arrives), so a slow
+    console can't stall the serial receive loop.
+    """
+    if not verbose:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        return
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    buffered = logging.handlers.MemoryHandler(
+        LOG_BATCH_SIZE, flushLevel=logging.WARNING, target=console
     )
+    logging.basicConfig(level=logging.DEBUG, handlers=[buffered])
+
+
+def flush_log():
+    """Writes out buffered log records, once per finished test phase."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+def send_command(ser, command_str):
+    """Sends a command string to Arduino and logs debug info."""
+    data = command_str.encode("utf-8")
+    ser.write(data)
+    log.debug("[SENT] ASCII: %r", data)
+
+
+def drain_stale_input(ser, quiet_s=0):
+    """
+    Discards bytes already waiting on the port (e.g. leftover debug lines)
+    before a strict protocol phase. Like flushInput, it also drops anything
+    that arrives while it runs, so call it before sending the command whose
+    reply matters, never after. With quiet_s, keeps draining until the line
+    has been silent that long.
+    """
+    port_timeout = ser.timeout
+    # Each read blocks in the driver for up to quiet_s; an empty read means
+    # the line has gone quiet.
+    ser.timeout = quiet_s
+    try:
+        while ser.read(ser.in_waiting or 1):
+            pass
+    finally:
+        ser.timeout = port_timeout
 
 
 def read_line_with_timeout(ser, timeout_s=5, expected_prefix=None):
     """Reads a line from serial with a timeout, optionally checking for a prefix."""
-    start_time = time.time()
-    buffer = ""
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            try:
-                char = ser.read(1).decode("utf-8", errors="ignore")
-                buffer += char
-                if "\n" in buffer:
-                    line = buffer.split("\n")[0].strip()
-                    print(f"[RECV] Line: '{line}'")
-                    if expected_prefix and not line.startswith(expected_prefix):
-                        # If we're expecting a specific prefix and don't get it,
-                        # it might be a debug message, so we continue reading.
-                        buffer = buffer.split("\n", 1)[1] if "\n" in buffer else ""
-                        continue
-                    return line
-            except UnicodeDecodeError:
-                # Handle cases where a byte might not be a valid UTF-8 character
-                print("[RECV] UnicodeDecodeError: Skipping byte.")
-                buffer = ""  # Clear buffer on error to avoid accumulating bad data
-        time.sleep(0.001)  # Small delay to prevent busy-waiting
-    print(
-        f"[RECV] Timeout after {timeout_s}s. No line received or expected prefix '{expected_prefix}' not found."
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Let the driver block until a full line arrives, then decode it once.
+            ser.timeout = remaining
+            raw = ser.read_until(b"\n")
+            if not raw.endswith(b"\n"):
+                break  # Timed out before the line was complete
+            line = raw.decode("utf-8", errors="ignore").strip()
+            log.debug("[RECV] Line: '%s'", line)
+            if expected_prefix and not line.startswith(expected_prefix):
+                # If we're expecting a specific prefix and don't get it,
+                # it might be a debug message, so we continue reading.
+                continue
+            return line
+    finally:
+        ser.timeout = port_timeout
+    log.warning(
+        "[RECV] Timeout after %ss. No line received or expected prefix '%s' not found.",
+        timeout_s,
+        expected_prefix,
     )
     return None
 
 
 def wait_for_ack(ser, timeout_s=5):
     """Waits for an ACK message from the Arduino."""
-    print("[RECV] Waiting for ACK...")
-    start_time = time.time()
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
-            print(f"[RECV] Line: '{line}'")
+    log.debug("[RECV] Waiting for ACK...")
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Block in the driver until a line arrives rather than polling.
+            ser.timeout = remaining
+            raw = ser.readline()
+            if not raw:
+                break
+            line = raw.decode("utf-8", errors="ignore").strip()
+            log.debug("[RECV] Line: '%s'", line)
             # The Arduino sends "OK: Segment X (Name) config applied." for each segment
             # or "-> Sent ACK" for the initial command.
-            if (
-                "-> Sent ACK" in line
-                or "OK: Segment" in line
-                or "OK: All segment configurations received" in line
-            ):
-                print("[RECV] ACK received.")
+            if ACK_RE.search(line):
+                log.debug("[RECV] ACK received.")
                 return True
-            elif "ERR:" in line or "error" in line:
-                print(f"[RECV] Error detected: {line}")
+            elif ERR_RE.search(line):
+                log.warning("[RECV] Error detected: %s", line)
                 return False
-        time.sleep(0.001)
-    print("[RECV] Timeout: No ACK received.")
+    finally:
+        ser.timeout = port_timeout
+    log.warning("[RECV] Timeout: No ACK received.")
     return False
 
 
 # --- Arduino Data Fetching Functions ---
 
 
+def json_depth_delta(line):
+    """
+    Returns how many '{'/'[' the line opens minus how many it closes, ignoring
+    brackets inside JSON strings (which can't span lines).
+    """
+    bare = JSON_STRING_RE.sub("", line)
+    return bare.count("{") + bare.count("[") - bare.count("}") - bare.count("]")
+
+
 def read_json_response(ser, timeout_s=15):
     """
     Reads lines from serial until a complete, valid JSON object is received or timeout.
     Intelligently attempts to parse the buffer as JSON and discards non-JSON debug lines.
     """
-    json_str_buffer = ""
-    start_time = time.time()
-
-    # List of common Arduino debug prefixes to ignore when building JSON buffer
-    debug_prefixes = [
-        "Serial RX (Raw):",
-        "Serial Command Received:",
-        "Serial Command:",
-        "CMD:",
-        "-> Sending",
-        "OK:",
-        "ERR:",
-        "BLE TX Failed:",
-        "Expected segments to receive:",
-        "Received segment JSON:",
-    ]
+    json_buffer = bytearray()  # Raw bytes of the JSON lines received so far
+    depth = 0  # Open brackets/braces in json_buffer not yet closed
+    start_time = time.monotonic()
 
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
-            print(f"[RECV] Line: '{line}'")  # Always print the raw line for debugging
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = timeout_s - (time.monotonic() - start_time)
+            if remaining <= 0:
+                break
+            # Block in the driver until a line arrives rather than polling.
+            ser.timeout = remaining
+            raw = ser.readline().strip()
+            if not raw:
+                continue
+            line = raw.decode("utf-8", errors="ignore")
+            log.debug("[RECV] Line: '%s'", line)
 
             # Check if the line is a debug message
-            is_debug_line = False
-            for prefix in debug_prefixes:
-                if line.startswith(prefix):
-                    is_debug_line = True
-                    break
-
-            if is_debug_line:
+            if line.startswith(DEBUG_PREFIXES):
                 # If it's a debug line, reset the timeout and continue to next line
-                start_time = time.time()
+                start_time = time.monotonic()
                 continue
 
             # If it's not a debug line, assume it's part of the JSON response
-            json_str_buffer += line
+            json_buffer += raw
+            depth += json_depth_delta(line)
 
-            # Try to parse the current buffer as JSON
-            if json_str_buffer:  # Only try if there's something in the buffer
+            # Only try to parse once the brackets balance, instead of
+            # re-parsing the growing buffer after every line
+            if json_buffer and depth <= 0:
                 try:
-                    parsed_json = json.loads(json_str_buffer)
+                    parsed_json = json.loads(json_buffer)
                     return parsed_json  # Successfully parsed, return it!
-                except json.JSONDecodeError:
-                    # Not a complete or valid JSON yet, keep buffering
+                except ValueError:
+                    # Not a complete or valid JSON yet (or not valid UTF-8), keep buffering
                     pass
 
             # Reset timeout if any data is coming in (even if it's not yet a full JSON)
-            start_time = time.time()
-        time.sleep(0.001)  # Small delay
+            start_time = time.monotonic()
+    finally:
+        ser.timeout = port_timeout
 
     print(
-        f"Timeout: Did not receive full JSON within {timeout_s} seconds. Current buffer: '{json_str_buffer}'"
+        f"Timeout: Did not receive full JSON within {timeout_s} seconds. Current buffer: {bytes(json_buffer)!r}"
     )
     return None
 
 
 def get_available_effects(ser):
     """Fetches the list of available effects from the Arduino."""
-    ser.flushInput()  # Clear buffer before sending command
     send_command(ser, "listeffects\n")
     print("Waiting for available effects list from Arduino...")
 
@@ -155,7 +249,6 @@ def get_available_effects(ser):
 
 def get_effect_info(ser, effect_name):
     """Fetches parameter info for a specific effect from the Arduino."""
-    ser.flushInput()  # Clear buffer before sending command
     command = f"geteffectinfo 0 {effect_name}\n"  # Use segment 0 as a dummy
     send_command(ser, command)
     print(f"Waiting for effect info for '{effect_name}' from Arduino...")
@@ -184,7 +277,6 @@ def get_all_segment_configs(ser):
     """Sends 'getallsegmentconfigs' and receives all segment JSONs."""
     all_segments_data = []
 
-    ser.flushInput()  # Clear buffer before sending command
     send_command(ser, "getallsegmentconfigs\n")
 
     print("Waiting for segment configurations JSON from Arduino...")
@@ -203,47 +295,87 @@ def set_all_segment_configs(ser, segments_to_send):
     """Sends 'setallsegmentconfigs' and then the segment data."""
     print("\n--- Initiating Set All Segment Configurations ---")
 
-    # 1. Send the initial command (text command to SerialCommandHandler)
-    ser.flushInput()  # Clear buffer before sending command
-    send_command(ser, "setallsegmentconfigs\n")
+    # 1. Send the initial command (text command to SerialCommandHandler) and
+    # 2. the 2-byte segment count (binary data) in a single write. The firmware
+    # reads the command line up to its newline and leaves the count bytes
+    # buffered until the batch transfer it starts picks them up.
+    drain_stale_input(ser)  # Leftover ACK lines would be mistaken for this phase's
+    num_segments = len(segments_to_send)
+    count_bytes = U16_BE.pack(num_segments)
+    log.debug(
+        "[SEND] Command: 'setallsegmentconfigs' + Segment Count: %d | Bytes: %r",
+        num_segments,
+        count_bytes,
+    )
+    ser.write(b"setallsegmentconfigs\n" + count_bytes)
+
     if not wait_for_ack(ser):
         print("Failed to receive ACK for setallsegmentconfigs command initiation.")
         return False
-
-    # 2. Send the 2-byte segment count (binary data)
-    num_segments = len(segments_to_send)
-    count_bytes = struct.pack(
-        ">H", num_segments
-    )  # >H means Big-endian, unsigned short (2 bytes)
-    print(f"[SEND] Segment Count: {num_segments} | Bytes: {count_bytes.hex()}")
-    ser.write(count_bytes)
-
     if not wait_for_ack(ser):
         print("Failed to receive ACK for segment count.")
         return False
 
-    # 3. Send each segment's JSON configuration (text data)
+    # 3. Send each segment's JSON configuration (text data). The firmware parses
+    # one JSON object per receive, so each segment stays ACK-gated; the ACK
+    # itself paces the writes. All payloads are encoded once, compactly, before
+    # the first is sent.
+    payloads = [
+        # Add newline for readline on Arduino
+        (_compact_json_encode(segment_data) + "\n").encode("utf-8")
+        for segment_data in segments_to_send
+    ]
     print(f"\nSending {num_segments} segment configurations...")
-    for i, segment_data in enumerate(segments_to_send):
-        ser.flushInput()  # Clear buffer before sending each segment JSON
-        json_segment = (
-            json.dumps(segment_data) + "\n"
-        )  # Add newline for readline on Arduino
-        print(f"[SEND] Segment {i+1}/{num_segments} JSON: '{json_segment.strip()}'")
-        ser.write(json_segment.encode("utf-8"))
+    for i, payload in enumerate(payloads):
+        log.debug("[SEND] Segment %d/%d JSON: %r", i + 1, num_segments, payload)
+        ser.write(payload)
 
         # Wait for ACK for each segment
         if not wait_for_ack(ser):
             print(f"Failed to receive ACK for segment {i+1}. Aborting.")
             return False
 
-        print(f"Successfully sent segment {i+1}.")
-        time.sleep(0.05)  # Small delay between segments
+        log.debug("Successfully sent segment %d.", i + 1)
 
     print("\n--- All segment configurations sent successfully! ---")
     return True
 
 
+def make_param_generator(param):
+    """
+    Returns a callable mapping a uniform draw in [0, 1) to a value within the
+    parameter's range, or None for an unknown parameter type.
+    """
+    param_type = param["type"]
+    min_val = param.get("min_val")
+    max_val = param.get("max_val")
+
+    if param_type == "integer":
+        low = int(min_val if min_val is not None else 0)
+        span = int(max_val if max_val is not None else 255) - low + 1
+        return lambda u: low + int(u * span)
+    elif param_type == "float":
+        low = min_val if min_val is not None else 0.0
+        high = max_val if max_val is not None else 1.0
+        return lambda u: round(low + u * (high - low), 2)
+    elif param_type == "color":
+        return lambda u: int(u * 0x1000000)
+    elif param_type == "boolean":
+        return lambda u: u < 0.5
+    return None
+
+
+def uniform_draws(count):
+    """
+    Returns an iterator over count uniform values in [0, 1). Large batches come
+    from one NumPy call when NumPy is installed; below NUMPY_MIN_DRAWS the
+    array setup costs more than calling random.random per value.
+    """
+    if np is not None and count >= NUMPY_MIN_DRAWS:
+        return iter(np.random.default_rng().random(count).tolist())
+    return iter([random.random() for _ in range(count)])
+
+
 def generate_test_segments(ser, led_count=45):  # Default changed to 45
     """
     Generates a set of test segments dynamically:
@@ -277,6 +409,11 @@ def generate_test_segments(ser, led_count=45):  # Default changed to 45
         print("Error: No effects available to assign to segments.")
         return []
 
+    # Draw every parameter's random value up front in one batch
+    draws = uniform_draws(
+        sum(len(effect_param_info.get(name, ())) for name in dynamic_effects)
+    )
+
     # Segment 0: The "all" segment (always present, usually covers the whole strip)
     segments.append(
         {
@@ -329,28 +466,9 @@ def generate_test_segments(ser, led_count=45):  # Default changed to 45
         if chosen_effect in effect_param_info:
             # print(f"DEBUG: Parameters for {chosen_effect} before assignment: {effect_param_info[chosen_effect]}") # Debug line
             for param in effect_param_info[chosen_effect]:
-                param_name = param["name"]
-                param_type = param["type"]
-                min_val = param.get("min_val")
-                max_val = param.get("max_val")
-
-                if param_type == "integer":
-                    segment[param_name] = random.randint(
-                        int(min_val if min_val is not None else 0),
-                        int(max_val if max_val is not None else 255),
-                    )
-                elif param_type == "float":
-                    segment[param_name] = round(
-                        random.uniform(
-                            min_val if min_val is not None else 0.0,
-                            max_val if max_val is not None else 1.0,
-                        ),
-                        2,
-                    )
-                elif param_type == "color":
-                    segment[param_name] = random.randint(0, 0xFFFFFF)
-                elif param_type == "boolean":
-                    segment[param_name] = random.choice([True, False])
+                generate = make_param_generator(param)
+                if generate is not None:
+                    segment[param["name"]] = generate(next(draws))
         else:
             print(
                 f"Warning: No parameter info found for effect: {chosen_effect}. Skipping parameter assignment."
@@ -395,8 +513,15 @@ def main():
         default=45,  # Changed default to 45
         help="The total number of LEDs on the strip. Used for generating test segment ranges.",
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log every line sent and received on the serial port.",
+    )
     args = parser.parse_args()
 
+    configure_logging(args.verbose)
+
     # Initialize test results
     get_test_status = "NOT RUN"
     get_test_reason = ""
@@ -410,7 +535,7 @@ def main():
     try:
         ser = serial.Serial(args.port, args.baud, timeout=5)
         time.sleep(3)  # Increased initial delay for Arduino boot-up
-        ser.flushInput()  # Clear any residual data in the input buffer
+        drain_stale_input(ser, quiet_s=0.05)  # Boot output may still be arriving
         print("Connection established and buffer flushed.")
     except serial.SerialException as e:
         print(f"Error opening serial port: {e}")
@@ -432,6 +557,7 @@ def main():
             except Exception as e:
                 get_test_status = "FAILED"
                 get_test_reason = f"Exception during GET test: {e}"
+            flush_log()
             time.sleep(1)  # Give some time before the next operation
 
         if args.mode == "set" or args.mode == "both":
@@ -452,6 +578,7 @@ def main():
             except Exception as e:
                 set_test_status = "FAILED"
                 set_test_reason = f"Exception during SET test: {e}"
+            flush_log()
             time.sleep(1)  # Give some time after sending
 
             # This is the requested verification step
@@ -480,6 +607,7 @@ def main():
     except Exception as e:
         print(f"An unexpected error occurred during test execution: {e}")
     finally:
+        flush_log()
         if ser and ser.is_open:
             ser.close()
             print("Serial port closed.")
@@ -41,8 +41,8 @@ def run_get_all_effects_test(serial_port, baud_rate):
         print("\n--- Reading Initial Response ---")
         # First, attempt to read the 3-byte binary response directly
         binary_response = b''
-        start_time_binary = time.time()
-        while len(binary_response) < 3 and (time.time() - start_time_binary < 5):
+        start_time_binary = time.monotonic()
+        while len(binary_response) < 3 and (time.monotonic() - start_time_binary < 5):
             if ser.in_waiting > 0:
                 # Read whatever is available up to the remaining needed bytes
                 binary_response += ser.read(min(ser.in_waiting, 3 - len(binary_response)))
@@ -62,7 +62,7 @@ def run_get_all_effects_test(serial_port, baud_rate):
 
         # Now, read and print the subsequent text debug messages
         print("\n--- Arduino Debug Output (after binary count) ---")
-        start_time_debug_text = time.time()
+        start_time_debug_text = time.monotonic()
         while True:
             try:
                 line = ser.readline().decode('utf-8').strip()
@@ -70,7 +70,7 @@ def run_get_all_effects_test(serial_port, baud_rate):
                     print(line)
                     if "Now waiting for ACK to send first effect..." in line:
                         break # This is the last debug line before expecting ACK
-                if time.time() - start_time_debug_text > 5: # Timeout for these debug lines
+                if time.monotonic() - start_time_debug_text > 5: # Timeout for these debug lines
                     print("Timeout waiting for full debug output lines.")
                     break
             except UnicodeDecodeError:
@@ -91,7 +91,7 @@ def run_get_all_effects_test(serial_port, baud_rate):
 
             # b. Read JSON response for the current effect
             json_buffer = ""
-            start_time_json = time.time()
+            start_time_json = time.monotonic()
             while True:
                 line = ser.readline().decode('utf-8').strip()
                 if line:
@@ -100,7 +100,7 @@ def run_get_all_effects_test(serial_port, baud_rate):
                         json_buffer = line
                         break # Found the JSON line
                     print(f"Arduino (debug): {line}") # Print other lines as debug
-                if time.time() - start_time_json > 10: # Timeout for receiving JSON
+                if time.monotonic() - start_time_json > 10: # Timeout for receiving JSON
                     print(f"Timeout waiting for JSON for effect {i+1}.")
                     break
 
@@ -15,12 +15,18 @@ import sys
 import time
 from typing import Any, Dict, Optional
 
+try:
+    import orjson # Optional: faster JSON parsing and encoding
+except ImportError:
+    orjson = None
+
 # --- Constants ---
 BAUD_RATE = 115200
 SERIAL_TIMEOUT = 0.5
 RESTART_DELAY = 5 # Increased delay for OS to recognize the device
 DEFAULT_LED_COUNT = 45
 DEVICE_READY_MSG = "Setup complete. Entering main loop..."
+READ_IDLE_TIMEOUT = 0.05 # Silence on the line that marks the end of a response
 
 # --- Binary Command Definitions ---
 CMD_SET_COLOR = 0x01
@@ -56,18 +62,29 @@ def parse_json_from_response(response: str) -> Dict[str, Any]:
     start_pos = min(p for p in [start_brace, start_bracket] if p != -1)
 
     try:
+        if orjson is not None:
+            return orjson.loads(response[start_pos:])
         return json.loads(response[start_pos:])
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError as e: # orjson.JSONDecodeError subclasses it
         raise TestError(f"Failed to parse JSON from response: '{response[start_pos:]}'. Error: {e}")
 
 def read_all(ser: serial.Serial) -> str:
-    """Reads all available data from the serial port with a timeout."""
-    data = b""
-    start_time = time.time()
-    while time.time() - start_time < SERIAL_TIMEOUT:
-        if ser.in_waiting > 0:
-            data += ser.read(ser.in_waiting)
-        time.sleep(0.01)
+    """
+    Reads a full response: blocks (up to the port timeout) for the first byte,
+    then drains whatever follows until the line goes quiet.
+    """
+    data = ser.read(1)
+    if data:
+        port_timeout = ser.timeout
+        ser.timeout = READ_IDLE_TIMEOUT
+        try:
+            while True:
+                chunk = ser.read(ser.in_waiting or 1)
+                if not chunk:
+                    break
+                data += chunk
+        finally:
+            ser.timeout = port_timeout
     return data.decode("utf-8", errors="ignore").strip()
 
 def send_command(ser: serial.Serial, command: str, quiet: bool = False) -> str:
@@ -77,7 +94,6 @@ def send_command(ser: serial.Serial, command: str, quiet: bool = False) -> str:
         print(f">>> SEND ({prefix}): {command[:100]}{'...' if len(command) > 100 else ''}")
 
     ser.write((command + "\n").encode())
-    time.sleep(SERIAL_TIMEOUT)
     response = read_all(ser)
 
     if not quiet:
@@ -93,9 +109,9 @@ def send_command(ser: serial.Serial, command: str, quiet: bool = False) -> str:
 def wait_for_device_ready(ser: serial.Serial, timeout: int = 10) -> None:
     """Waits for the device to signal it's ready after a restart."""
     print("      Waiting for device to be ready...")
-    start_time = time.time()
+    start_time = time.monotonic()
     buffer = ""
-    while time.time() - start_time < timeout:
+    while time.monotonic() - start_time < timeout:
         if ser.in_waiting > 0:
             buffer += ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
             if DEVICE_READY_MSG in buffer:
@@ -192,7 +208,10 @@ def test_all_serial_commands(ser: serial.Serial, json_config_path: str):
     assert "segments" in parse_json_from_response(config_str), "getconfig failed to return valid JSON."
 
     with open(json_config_path, "r") as f:
-        compact_json = json.dumps(json.load(f), separators=(",", ":"))
+        if orjson is not None:
+            compact_json = orjson.dumps(orjson.loads(f.read())).decode()
+        else:
+            compact_json = json.dumps(json.load(f), separators=(",", ":"))
     send_command(ser, f"batchconfig {compact_json}")
     status = parse_json_from_response(send_command(ser, "getstatus"))
     assert len(status["segments"]) >= 3, "batchconfig did not apply new segments."
@@ -4,12 +4,19 @@ Comprehensive test harness for RaveController_v1 serial commands.
 This script has been updated to match the BaseEffect-based firmware.
 """
 import argparse
+import mmap
 import serial
 import time
 import json
 import re
 import sys
 import os
+import subprocess
+
+try:
+    import simdjson  # Optional SIMD-accelerated JSON parser
+except ImportError:
+    simdjson = None
 
 # Command IDs matching Processes.h
 CMD_SET_COLOR        = 0x01
@@ -25,7 +32,12 @@ CMD_NUM_PIXELS       = 0x0A
 CMD_GET_EFFECT_INFO  = 0x0B
 
 BAUD  = 115200
-DELAY = 0.2  # seconds between commands
+DELAY = 0.2  # longest wait for a response to start
+READ_IDLE_TIMEOUT = 0.05  # silence on the line that marks the end of a response
+PIPELINE_REPLY_TIMEOUT = 2.0  # per pipelined command, added up into one overall deadline
+
+# Finds LED_COUNT in Config.h, works for #define and constexpr
+LED_COUNT_RE = re.compile(rb'(?:#define|constexpr\s+\w+\s+)\bLED_COUNT\s+[=]?\s*(\d+)')
 
 # Updated ASCII commands to match the new firmware API
 ASCII_COMMANDS = [
@@ -46,10 +58,16 @@ ASCII_COMMANDS = [
     "batchconfig {\"segments\":[{\"startLed\":0,\"endLed\":20,\"name\":\"segA\",\"brightness\":100,\"effect\":\"SolidColor\"}]}"
 ]
 
-# Simplified binary commands to only those with explicit handlers in C++
+# Sent after each pipelined command; its reply marks where that command's
+# response ends. Firmware without 'ping' rejects it, which marks it just as well.
+SENTINEL_CMD = "ping"
+SENTINEL_REPLIES = ("OK: pong", "ERR: Unknown command 'ping'")
+
+# Simplified binary commands to only those with explicit handlers in C++.
+# Immutable bytes, built once, so they go to ser.write as-is.
 BINARY_COMMANDS = [
-    bytearray([CMD_CLEAR_SEGMENTS]),
-    bytearray([CMD_GET_STATUS]),
+    bytes([CMD_CLEAR_SEGMENTS]),
+    bytes([CMD_GET_STATUS]),
 ]
 
 # Effect names are now hardcoded as there's no command to list them all.
@@ -72,75 +90,181 @@ def load_expected_pixels(config_path=None):
     if not os.path.exists(config_path):
         raise FileNotFoundError(f"Config file not found at {config_path}")
 
-    with open(config_path, 'r') as f:
-        text = f.read()
-
-    # Regex to find LED_COUNT, works for #define and constexpr
-    match = re.search(r'(?:#define|constexpr\s+\w+\s+)\bLED_COUNT\s+[=]?\s*(\d+)', text)
-    if not match:
-        raise RuntimeError(f"Could not find LED_COUNT in {config_path}")
-    return int(match.group(1))
+    # Search the mapped file bytes directly instead of reading a str copy
+    with open(config_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        match = LED_COUNT_RE.search(mm)
+        if not match:
+            raise RuntimeError(f"Could not find LED_COUNT in {config_path}")
+        return int(match.group(1))
 
 EXPECTED_PIXELS = load_expected_pixels()
 
+# One reusable simdjson parser; None when pysimdjson isn't installed
+_json_parser = simdjson.Parser() if simdjson else None
+
+def parse_json(text):
+    """Parse a JSON response into plain dicts/lists; raises ValueError if invalid."""
+    if _json_parser is None:
+        return json.loads(text)
+    doc = _json_parser.parse(text.encode("utf-8"))
+    # Materialize now: the next parse() invalidates this document's proxies
+    if isinstance(doc, simdjson.Object):
+        return doc.as_dict()
+    if isinstance(doc, simdjson.Array):
+        return doc.as_list()
+    return doc
+
+def set_usb_latency_timer(port, ms=1):
+    """
+    Write the USB-serial adapter's latency timer through sysfs on Linux.
+    Returns True if it was set; native CDC-ACM ports have no such timer.
+    """
+    name = os.path.basename(os.path.realpath(port))
+    try:
+        with open(f"/sys/bus/usb-serial/devices/{name}/latency_timer", "w") as f:
+            f.write(str(ms))
+        return True
+    except OSError:
+        return False  # not a usb-serial device, or no write permission
+
+def enable_low_latency(ser):
+    """
+    Turn off the USB-serial receive latency timer (Linux ASYNC_LOW_LATENCY) so
+    each response isn't held back by the driver's 16 ms default. Falls back to
+    the sysfs latency_timer, then 'setserial <port> low_latency' on Linux; on
+    Windows set the FTDI port's "Latency Timer" to 1 ms in Device Manager instead.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+        return
+    except (AttributeError, ValueError, IOError, NotImplementedError):
+        pass
+    if sys.platform.startswith("linux"):
+        if set_usb_latency_timer(ser.port):
+            return
+        try:
+            subprocess.run(["setserial", ser.port, "low_latency"],
+                           check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError):
+            pass  # setserial missing or not permitted; keep default latency
+
 def read_all(ser):
-    """Read all available data from the serial port with a timeout."""
-    data = b""
-    start_time = time.time()
-    while time.time() - start_time < DELAY:
-        if ser.in_waiting > 0:
-            data += ser.read(ser.in_waiting)
-        else:
-            time.sleep(0.01) # Avoid busy-waiting
-    
+    """Read a full response: block for the first byte, then drain until the line goes idle."""
+    data = ser.read(1)
+    if data:
+        # A single ser.read(4096) with inter_byte_timeout would not end on
+        # silence here: pyserial's POSIX read keeps selecting until the full
+        # size or the overall timeout, so it always waits out DELAY. Draining
+        # what is waiting under a short timeout returns READ_IDLE_TIMEOUT
+        # after the last byte instead.
+        port_timeout = ser.timeout
+        ser.timeout = READ_IDLE_TIMEOUT
+        try:
+            while True:
+                chunk = ser.read(ser.in_waiting or 1)
+                if not chunk:
+                    break
+                data += chunk
+        finally:
+            ser.timeout = port_timeout
+
     try:
         return data.decode("utf-8", errors="ignore").strip()
     except UnicodeDecodeError:
         return str(data)
 
-def send_ascii(ser, cmd):
-    """Send an ASCII command and print the response, with validation."""
-    print(f">>> ASCII: {cmd}")
-    ser.write((cmd + "\n").encode())
-    time.sleep(DELAY)
-    resp = read_all(ser)
-    print(resp or "<no response>")
-
-    # --- JSON Validations ---
+def validate_ascii_response(cmd, resp):
+    """Check the JSON responses of the ASCII commands that return JSON."""
     if cmd == "getstatus":
         try:
-            obj = json.loads(resp)
+            obj = parse_json(resp)
             assert "segments" in obj and isinstance(obj["segments"], list)
             print("  -> getstatus JSON OK")
-        except (json.JSONDecodeError, AssertionError) as e:
+        except (ValueError, AssertionError) as e:
             print(f"  !! getstatus JSON error: {e}")
             
     if cmd.startswith("geteffectinfo"):
         try:
-            obj = json.loads(resp)
+            obj = parse_json(resp)
             assert "effect" in obj and "params" in obj
             assert isinstance(obj["params"], list)
             print("  -> geteffectinfo JSON OK")
-        except (json.JSONDecodeError, AssertionError) as e:
+        except (ValueError, AssertionError) as e:
             print(f"  !! geteffectinfo JSON error: {e}")
 
+def send_ascii(ser, cmd):
+    """Send an ASCII command and print the response, with validation."""
+    print(f">>> ASCII: {cmd}")
+    ser.write((cmd + "\n").encode())
+    resp = read_all(ser)
+    print(resp or "<no response>")
+    validate_ascii_response(cmd, resp)
     return resp
 
+def send_ascii_pipeline(ser, cmds):
+    """
+    Write all cmds in one go, each followed by a 'ping' whose reply marks the
+    end of that command's response, then split the reply stream per command.
+    Returns one response per command ("" for any that never completed).
+    """
+    ser.write("".join(f"{cmd}\n{SENTINEL_CMD}\n" for cmd in cmds).encode())
+    responses = []
+    lines = []
+    # One deadline for the whole batch rather than DELAY per line, so a single
+    # slow reply doesn't cut off the ones queued behind it.
+    deadline = time.monotonic() + PIPELINE_REPLY_TIMEOUT * len(cmds)
+    port_timeout = ser.timeout
+    try:
+        while len(responses) < len(cmds):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ser.timeout = remaining
+            raw = ser.readline()
+            if not raw.endswith(b"\n"):
+                if raw:
+                    lines.append(raw.decode("utf-8", errors="ignore").strip())
+                break
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if line.startswith(SENTINEL_REPLIES):
+                responses.append("\n".join(lines))
+                lines = []
+            elif line:
+                lines.append(line)
+    finally:
+        ser.timeout = port_timeout
+    if len(responses) < len(cmds):
+        # Replies still on their way would otherwise be read as the response
+        # to whatever is sent next, binary commands included.
+        read_all(ser)
+        ser.reset_input_buffer()
+        responses.append("\n".join(lines))
+    responses += [""] * (len(cmds) - len(responses))
+    return responses
+
+def run_ascii_commands(ser, cmds):
+    """Run cmds pipelined in a single write, then print and validate each response."""
+    for cmd, resp in zip(cmds, send_ascii_pipeline(ser, cmds)):
+        print(f">>> ASCII: {cmd}")
+        print(resp or "<no response>")
+        validate_ascii_response(cmd, resp)
+        print("-" * 20)
+
 def send_binary(ser, packet):
     """Send a binary command packet and print the response."""
     print(f">>> BINARY: {[hex(b) for b in packet]}")
     ser.write(packet)
-    time.sleep(DELAY)
     resp = read_all(ser)
     print(resp or "<no response>")
 
     # --- JSON Validation for Binary GET_STATUS ---
     if packet[0] == CMD_GET_STATUS:
         try:
-            obj = json.loads(resp)
+            obj = parse_json(resp)
             assert "segments" in obj
             print("  -> binary GET_STATUS JSON OK")
-        except (json.JSONDecodeError, AssertionError) as e:
+        except (ValueError, AssertionError) as e:
             print(f"  !! binary GET_STATUS JSON error: {e}")
 
     return resp
@@ -168,13 +292,12 @@ def run_tests(port, baud):
     print(f"Found LED_COUNT = {EXPECTED_PIXELS} in Config.h")
     try:
         with serial.Serial(port, baud, timeout=DELAY) as ser:
+            enable_low_latency(ser)
             time.sleep(1)  # Wait for Arduino to reset
             ser.reset_input_buffer()
 
             print("\n--- ASCII COMMANDS ---")
-            for cmd in ASCII_COMMANDS:
-                send_ascii(ser, cmd)
-                print("-" * 20)
+            run_ascii_commands(ser, ASCII_COMMANDS)
 
             print("\n--- BINARY COMMANDS ---")
             for packet in BINARY_COMMANDS:
@@ -1,11 +1,17 @@
 import serial
-import json
 import time
 import sys
 import argparse
 import struct
 import random
 
+# Batch-upload steps are acknowledged by "-> Sent ACK ..." lines; other "OK:"
+# messages printed along the way (e.g. clearing segments) are not ACKs.
+UPLOAD_ACK_MARKERS = ("-> Sent ACK",)
+
+# Big-endian unsigned 16-bit field, used for the segment count
+U16_BE = struct.Struct(">H")
+
 # --- Serial Communication Helpers ---
 
 def send_command(ser, command_str):
@@ -16,101 +22,169 @@ def send_command(ser, command_str):
         f"[SENT] ASCII: '{command_str.strip()}' | Bytes: {command_str.encode('utf-8').hex()}"
     )
 
-def wait_for_ack(ser, timeout_s=5):
-    """Waits for an ACK or relevant 'OK' message from the Arduino."""
+def enable_low_latency(ser):
+    """
+    Turns off the USB-serial driver's receive latency timer where supported
+    (Linux ASYNC_LOW_LATENCY), so short replies like ACKs aren't held back.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+        print("Low-latency mode enabled.")
+    except (AttributeError, ValueError, OSError) as e:
+        # Not available on this platform or driver; run at default latency.
+        print(f"Low-latency mode not available: {e}")
+
+def wait_for_sketch_ready(ser, timeout_s=3):
+    """
+    Pings the sketch until it answers instead of sleeping through the board's
+    auto-reset, so the script continues as soon as commands are accepted.
+    Firmware without 'ping' answers with an unknown-command error, which
+    shows it is ready just the same.
+    """
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    ser.timeout = 0.1
+    try:
+        while time.monotonic() < deadline:
+            ser.write(b"ping\n")
+            line = ser.readline()
+            while line and time.monotonic() < deadline:
+                if line.startswith((b"OK: pong", b"ERR: Unknown command")):
+                    return True
+                line = ser.readline()  # Boot messages; keep looking
+    finally:
+        ser.timeout = port_timeout
+    return False
+
+def drain_stale_input(ser):
+    """
+    Discards bytes already waiting on the port (e.g. leftover debug lines)
+    before a strict protocol phase. Like flushInput, it also drops anything
+    that arrives while it runs, so call it before sending the command whose
+    reply matters, never after.
+    """
+    while ser.in_waiting:
+        ser.read(ser.in_waiting)
+
+def wait_for_ack(ser, timeout_s=5, markers=("-> Sent ACK", "OK:")):
+    """Waits for an ACK or relevant 'OK' message (any of markers) from the Arduino."""
     print("[RECV] Waiting for ACK...")
-    start_time = time.time()
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Block in the driver until a line arrives rather than polling.
+            ser.timeout = remaining
+            raw = ser.readline()
+            if not raw:
+                break
+            line = raw.decode("utf-8", errors="ignore").strip()
             print(f"[RECV] Line: '{line}'")
-            if "-> Sent ACK" in line or "OK:" in line:
+            if any(marker in line for marker in markers):
                 print("[RECV] ACK received.")
                 return True
             elif "ERR:" in line:
                 print(f"[RECV] Error detected: {line}")
                 return False
-        time.sleep(0.01)
+    finally:
+        ser.timeout = port_timeout
     print("[RECV] Timeout: No ACK received.")
     return False
 
 # --- Configuration Generation and Upload ---
 
+# Wire format of one RainbowChase segment; only the id and LED range vary per row
+RAINBOW_CHASE_SEGMENT_TEMPLATE = (
+    b'{"id":%d,"name":"rc_segment_%d","startLed":%d,"endLed":%d,'
+    b'"brightness":200,"effect":"RainbowChase","speed":30}\n'  # A good default speed for RainbowChase
+)
+
 def generate_rainbow_chase_config(num_segments=13, leds_per_segment=45):
     """
-    Generates a list of segment configurations, all set to RainbowChase.
+    Generates the segment configurations, all set to RainbowChase, as
+    ready-to-send newline-terminated JSON lines.
     """
     segments = []
-    total_leds = num_segments * leds_per_segment
 
     for i in range(num_segments):
         start_led = i * leds_per_segment
         end_led = start_led + leds_per_segment - 1
-        
-        segment = {
-            "id": i + 1,
-            "name": f"rc_segment_{i+1}",
-            "startLed": start_led,
-            "endLed": end_led,
-            "brightness": 200,
-            "effect": "RainbowChase",
-            "speed": 30, # A good default speed for RainbowChase
-        }
-        segments.append(segment)
+        segments.append(RAINBOW_CHASE_SEGMENT_TEMPLATE % (i + 1, i + 1, start_led, end_led))
 
     print(f"\nGenerated {len(segments)} segments, all set to 'RainbowChase'.")
     return segments
 
+def apply_rainbow_chase_template(ser, num_segments, leds_per_segment, brightness=200, speed=30):
+    """
+    Asks the firmware to build the RainbowChase layout itself from a single
+    'rainbowchase' line instead of uploading one identical JSON per segment.
+    Returns True on success, False if the firmware doesn't know the command
+    (older builds) or rejects it, so the caller can fall back to the upload.
+    """
+    drain_stale_input(ser)
+    send_command(ser, f"rainbowchase {num_segments} {leds_per_segment} {brightness} {speed}\n")
+    return wait_for_ack(ser, markers=("RainbowChase segments configured",))
+
+def save_configuration(ser):
+    """Sends saveconfig and waits for the device to confirm."""
+    send_command(ser, "saveconfig\n")
+    if wait_for_ack(ser):
+        print("Configuration saved successfully to device memory.")
+        return True
+    print("Warning: Did not receive confirmation for save command.")
+    return False
+
 def upload_and_save_configuration(ser, segments_to_send):
-    """Uploads the segment configuration and then saves it to the device's memory."""
+    """
+    Uploads the segment configuration (encoded JSON lines, as produced by
+    generate_rainbow_chase_config) and then saves it to the device's memory.
+    """
     print("\n--- Uploading and Saving Configuration ---")
     
-    # 1. Send the command to initiate the upload process
-    ser.flushInput()
-    send_command(ser, "setallsegmentconfigs\n")
-    if not wait_for_ack(ser):
+    # 1. Send the command to initiate the upload process and 2. the number of
+    # segments in one write; the firmware leaves the count bytes buffered for
+    # the batch transfer the command starts.
+    drain_stale_input(ser)
+    num_segments = len(segments_to_send)
+    count_bytes = U16_BE.pack(num_segments)
+    print(f"[SEND] Command: 'setallsegmentconfigs' + Segment Count: {num_segments} | Bytes: {count_bytes.hex()}")
+    ser.write(b"setallsegmentconfigs\n" + count_bytes)
+    if not wait_for_ack(ser, markers=UPLOAD_ACK_MARKERS):
         print("Error: Did not receive initial ACK. Aborting.")
         return False
-
-    # 2. Send the number of segments
-    num_segments = len(segments_to_send)
-    count_bytes = struct.pack(">H", num_segments)
-    print(f"[SEND] Segment Count: {num_segments} | Bytes: {count_bytes.hex()}")
-    ser.write(count_bytes)
-    if not wait_for_ack(ser):
+    if not wait_for_ack(ser, markers=UPLOAD_ACK_MARKERS):
         print("Error: Did not receive ACK for segment count. Aborting.")
         return False
 
-    # 3. Send each segment's JSON data
+    # 3. Send each segment's JSON line. The firmware parses one JSON object per
+    # receive, so segments stay ACK-gated; the ACK itself paces the writes.
     print(f"\nSending {num_segments} segment configurations...")
-    for i, segment_data in enumerate(segments_to_send):
-        json_payload = json.dumps(segment_data) + "\n"
-        print(f"[SEND] Segment {i+1}/{num_segments}: {json_payload.strip()}")
-        ser.write(json_payload.encode("utf-8"))
-        if not wait_for_ack(ser):
+    for i, payload in enumerate(segments_to_send):
+        print(f"[SEND] Segment {i+1}/{num_segments}: {payload.decode().strip()}")
+        ser.write(payload)
+        if not wait_for_ack(ser, markers=UPLOAD_ACK_MARKERS):
             print(f"Error: Failed to receive ACK for segment {i+1}. Aborting.")
             return False
         print(f"Successfully sent segment {i+1}.")
-        time.sleep(0.1)
+    # Consume the batch completion message so it isn't taken as the save ACK
+    if not wait_for_ack(ser, markers=("OK: All segment configurations received",)):
+        print("Error: Device did not confirm the complete upload. Aborting.")
+        return False
 
     print("\n--- Configuration successfully uploaded! ---")
     
     # 4. Send the save command
-    send_command(ser, "saveconfig\n")
-    if wait_for_ack(ser):
-        print("Configuration saved successfully to device memory.")
-    else:
-        print("Warning: Did not receive confirmation for save command.")
-        return False
-        
-    return True
+    return save_configuration(ser)
 
 # --- Main Script Execution ---
 
 def main():
     parser = argparse.ArgumentParser(description="Quick RainbowChase Configuration Loader")
     parser.add_argument("--port", type=str, required=True, help="Serial port of the Arduino")
-    parser.add_argument("--baud", type=int, default=115200, help="Baud rate for serial connection")
+    parser.add_argument("--baud", type=int, default=921600, help="Baud rate for serial connection (must match Serial.begin on UART bridges; USB CDC boards ignore it)")
     parser.add_argument("--num_segments", type=int, default=13, help="Number of segments to create.")
     parser.add_argument("--leds_per_segment", type=int, default=45, help="Number of LEDs in each segment.")
     args = parser.parse_args()
@@ -120,16 +194,21 @@ def main():
     try:
         print(f"Connecting to {args.port} at {args.baud} baud...")
         ser = serial.Serial(args.port, args.baud, timeout=5)
-        time.sleep(3)
+        if not wait_for_sketch_ready(ser):
+            print("Warning: No reply to 'ping' yet; continuing anyway.")
+        enable_low_latency(ser)
         ser.flushInput()
         print("Connection established.")
 
-        # Generate the configuration
-        rainbow_chase_config = generate_rainbow_chase_config(args.num_segments, args.leds_per_segment)
-        
-        # Upload and save
-        if upload_and_save_configuration(ser, rainbow_chase_config):
-            success = True
+        # Let the firmware expand the layout from one line; older firmware
+        # without 'rainbowchase' gets the full per-segment JSON upload.
+        if apply_rainbow_chase_template(ser, args.num_segments, args.leds_per_segment):
+            success = save_configuration(ser)
+        else:
+            print("Template command not accepted; falling back to JSON upload.")
+            rainbow_chase_config = generate_rainbow_chase_config(args.num_segments, args.leds_per_segment)
+            if upload_and_save_configuration(ser, rainbow_chase_config):
+                success = True
 
     except serial.SerialException as e:
         print(f"Error: Could not open serial port {args.port}. {e}")
@@ -2,152 +2,428 @@ import serial
 import json
 import time
 import sys
+import re
+import queue
+import threading
 import argparse
+import logging
+import logging.handlers
+import subprocess
 import struct  # For converting integer to bytes
 import random  # For generating random-ish values for test data
 
+try:
+    import numpy as np  # Optional: bulk random draws for large parameter sets
+except ImportError:
+    np = None
+
+try:
+    import simdjson  # Optional: SIMD-accelerated parsing of JSON replies
+except ImportError:
+    simdjson = None
+
+try:
+    import msgspec  # Optional: faster, compact encoding of segment JSON
+except ImportError:
+    msgspec = None
+
+log = logging.getLogger(__name__)
+
+# One reusable simdjson parser; None when pysimdjson isn't installed
+_json_parser = simdjson.Parser() if simdjson else None
+
+# One reusable msgspec JSON encoder; None when msgspec isn't installed
+_json_encoder = msgspec.json.Encoder() if msgspec else None
+
 # --- Constants for binary commands (from BinaryCommandHandler.h) ---
 CMD_GET_ALL_EFFECTS = 0x10
 CMD_ACK_GENERIC = 0xA0  # This corresponds to CMD_ACK_GENERIC in the firmware
+_ACK_BYTES = bytes([CMD_ACK_GENERIC])  # Built once; sent after every effect JSON
+
+# Line prefixes wait_for_ack treats as an ACK or an error. The Arduino sends
+# "-> Sent ACK" for batch upload steps, "OK: Segment ..." for segment
+# changes and "OK: All effects sent." at the end of getalleffects.
+_ACK_PREFIXES = (
+    "-> Sent ACK",
+    "OK: Segment",
+    "OK: All segment configurations received",
+    "OK: All effects sent.",
+)
+_ERR_PREFIXES = ("ERR:",)
+
+# No spaces after ',' and ':' in JSON sent to the Arduino: fewer bytes to
+# transfer and to fit in its receive buffer
+COMPACT_JSON_SEPARATORS = (",", ":")
+
+# One reusable compact stdlib encoder, for when msgspec isn't installed
+_compact_json_encode = json.JSONEncoder(separators=COMPACT_JSON_SEPARATORS).encode
+
+# A complete JSON string literal, escapes included
+JSON_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+# Big-endian unsigned 16-bit field, used for segment counts and frame lengths
+U16_BE = struct.Struct(">H")
+
+# Number of 'geteffectinfo' commands written back-to-back before reading replies,
+# kept small so a group fits in the Arduino's serial receive buffer.
+EFFECT_INFO_GROUP_SIZE = 4
+
+# Parameter info per effect name, filled by get_effect_info(s). Effects are
+# compiled into the firmware, so their parameters don't change during a run.
+_effect_info_cache = {}
+
+# Below this many random parameter values, per-value random.random beats NumPy setup
+NUMPY_MIN_DRAWS = 50
+
+# Debug records buffered by --verbose logging before they are written out
+LOG_BATCH_SIZE = 256
 
 # --- Helper Functions for Serial Communication ---
 
 
-def send_command(ser, command_str):
-    """Sends a text command string to Arduino and prints debug info."""
-    print(f"\n[SEND] Command: '{command_str.strip()}'")
-    ser.write(command_str.encode("utf-8"))
-    print(
-        f"[SENT] ASCII: '{command_str.strip()}' | Bytes: {command_str.encode('utf-8').hex()}"
+def configure_logging(verbose):
+    """
+    Sets up log output. With verbose, the per-line DEBUG trace is buffered
+    and written in batches (or as soon as a warning arrives), so a slow
+    console can't stall the serial receive loop.
+    """
+    if not verbose:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        return
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(message)s"))
+    buffered = logging.handlers.MemoryHandler(
+        LOG_BATCH_SIZE, flushLevel=logging.WARNING, target=console
     )
+    logging.basicConfig(level=logging.DEBUG, handlers=[buffered])
+
+
+def flush_log():
+    """Writes out buffered log records, once per finished test phase."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+class HexBytes:
+    """
+    Wraps bytes for a log argument so they are only hex-encoded if the record
+    is actually emitted, not on every send at the default INFO level.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex()
+
+
+def send_command(ser, command):
+    """
+    Sends a text command to Arduino and logs debug info. The command may be a
+    str or bytes that are already encoded.
+    """
+    data = command.encode("utf-8") if isinstance(command, str) else command
+    log.debug("[SEND] Command: %r", data)
+    ser.write(data)
+
+
+def enable_low_latency(ser):
+    """
+    Turns off the USB-serial driver's receive latency timer where supported
+    (Linux ASYNC_LOW_LATENCY), so short replies like ACKs aren't held back.
+    If pyserial can't set it, Linux falls back to 'setserial <port> low_latency'.
+    On Windows, set the FTDI COM port's "Latency Timer" to 1 ms in Device
+    Manager (Port Settings > Advanced) instead; the default is 16 ms.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+        print("Low-latency mode enabled.")
+    except (AttributeError, ValueError, OSError, NotImplementedError) as e:
+        if sys.platform.startswith("linux"):
+            try:
+                subprocess.run(
+                    ["setserial", ser.port, "low_latency"],
+                    check=True,
+                    capture_output=True,
+                )
+                print("Low-latency mode enabled via setserial.")
+                return
+            except (OSError, subprocess.CalledProcessError):
+                pass  # setserial not installed or not permitted
+        # Not available on this platform or driver; run at default latency.
+        print(f"Low-latency mode not available: {e}")
+
+
+def wait_for_sketch_ready(ser, timeout_s=3):
+    """
+    Pings the sketch until it answers instead of sleeping through the board's
+    auto-reset, so the script continues as soon as commands are accepted.
+    Firmware without 'ping' answers with an unknown-command error, which
+    shows it is ready just the same.
+    """
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    ser.timeout = 0.1
+    try:
+        while time.monotonic() < deadline:
+            ser.write(b"ping\n")
+            line = ser.readline()
+            while line and time.monotonic() < deadline:
+                if line.startswith((b"OK: pong", b"ERR: Unknown command")):
+                    return True
+                line = ser.readline()  # Boot messages; keep looking
+    finally:
+        ser.timeout = port_timeout
+    return False
+
+
+def drain_stale_input(ser, quiet_s=0):
+    """
+    Discards bytes already waiting on the port (e.g. leftover debug lines)
+    before a strict protocol phase. Like flushInput, it also drops anything
+    that arrives while it runs, so call it before sending the command whose
+    reply matters, never after. With quiet_s, keeps draining until the line
+    has been silent that long.
+    """
+    port_timeout = ser.timeout
+    # Each read blocks in the driver for up to quiet_s; an empty read means
+    # the line has gone quiet.
+    ser.timeout = quiet_s
+    try:
+        while ser.read(ser.in_waiting or 1):
+            pass
+    finally:
+        ser.timeout = port_timeout
 
 
 def send_binary_command(ser, command_byte, payload=b""):
     """Sends a binary command byte followed by an optional payload."""
     full_command = bytes([command_byte]) + payload
-    print(
-        f"\n[SEND BINARY] Command: 0x{command_byte:02X} | Payload: {payload.hex()} | Full Bytes: {full_command.hex()}"
+    log.debug(
+        "[SEND BINARY] Command: 0x%02X | Payload: %s | Full Bytes: %s",
+        command_byte,
+        HexBytes(payload),
+        HexBytes(full_command),
     )
     ser.write(full_command)
 
 
 def read_line_with_timeout(ser, timeout_s=5, expected_prefix=None):
     """Reads a line from serial with a timeout, optionally checking for a prefix."""
-    start_time = time.time()
-    buffer = ""
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            try:
-                char = ser.read(1).decode("utf-8", errors="ignore")
-                buffer += char
-                if "\n" in buffer:
-                    line = buffer.split("\n")[0].strip()
-                    print(f"[RECV] Line: '{line}'")
-                    if expected_prefix and not line.startswith(expected_prefix):
-                        # If we're expecting a specific prefix and don't get it,
-                        # it might be a debug message, so we continue reading.
-                        buffer = buffer.split("\n", 1)[1] if "\n" in buffer else ""
-                        continue
-                    return line
-            except UnicodeDecodeError:
-                # Handle cases where a byte might not be a valid UTF-8 character
-                print("[RECV] UnicodeDecodeError: Skipping byte.")
-                buffer = ""  # Clear buffer on error to avoid accumulating bad data
-        time.sleep(0.001)  # Small delay to prevent busy-waiting
-    print(
-        f"[RECV] Timeout after {timeout_s}s. No line received or expected prefix '{expected_prefix}' not found."
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Let the driver block until a full line arrives, then decode it once.
+            ser.timeout = remaining
+            raw = ser.read_until(b"\n")
+            if not raw.endswith(b"\n"):
+                break  # Timed out before the line was complete
+            line = raw.decode("utf-8", errors="ignore").strip()
+            log.debug("[RECV] Line: '%s'", line)
+            if expected_prefix and not line.startswith(expected_prefix):
+                # If we're expecting a specific prefix and don't get it,
+                # it might be a debug message, so we continue reading.
+                continue
+            return line
+    finally:
+        ser.timeout = port_timeout
+    log.warning(
+        "[RECV] Timeout after %ss. No line received or expected prefix '%s' not found.",
+        timeout_s,
+        expected_prefix,
     )
     return None
 
 
 def read_exact_bytes(ser, num_bytes, timeout_s=5):
     """Reads exactly num_bytes from serial with a timeout."""
-    start_time = time.time()
-    buffer = b""
-    while time.time() - start_time < timeout_s and len(buffer) < num_bytes:
-        if ser.in_waiting > 0:
-            bytes_to_read = min(ser.in_waiting, num_bytes - len(buffer))
-            buffer += ser.read(bytes_to_read)
-        time.sleep(0.001)
+    # ser.read(n) blocks until all n bytes arrive or the timeout expires.
+    port_timeout = ser.timeout
+    ser.timeout = timeout_s
+    try:
+        buffer = ser.read(num_bytes)
+    finally:
+        ser.timeout = port_timeout
     if len(buffer) == num_bytes:
-        print(f"[RECV BINARY] Received {num_bytes} bytes: {buffer.hex()}")
+        log.debug("[RECV BINARY] Received %d bytes: %s", num_bytes, HexBytes(buffer))
         return buffer
     else:
-        print(
-            f"[RECV BINARY] Timeout or insufficient bytes received. Expected {num_bytes}, Got {len(buffer)}: {buffer.hex()}"
+        log.warning(
+            "[RECV BINARY] Timeout or insufficient bytes received. Expected %d, Got %d: %s",
+            num_bytes,
+            len(buffer),
+            buffer.hex(),
         )
         return None
 
 
-def wait_for_ack(ser, timeout_s=5):
-    """Waits for an ACK message from the Arduino."""
-    print("[RECV] Waiting for ACK...")
-    start_time = time.time()
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
-            print(f"[RECV] Line: '{line}'")
-            # The Arduino sends "OK: Segment X (Name) config applied." for each segment
-            # or "-> Sent ACK" for the initial command.
-            if (
-                "-> Sent ACK" in line
-                or "OK: Segment" in line
-                or "OK: All segment configurations received" in line
-                or "OK: All effects sent."
-                in line  # Added for the getalleffects final ACK
-            ):
-                print("[RECV] ACK received.")
+class SerialLineReader:
+    """
+    Background thread that drains the port line by line into a queue, so the
+    main thread can prepare its next write while a reply is still arriving.
+    While running it is the port's only reader, so use it for text-only phases
+    and pass its queue to wait_for_ack as lines.
+    """
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.lines = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                raw = self.ser.readline()  # Returns b"" when the port timeout expires
+            except serial.SerialException:
+                break
+            if raw:
+                self.lines.put(raw.decode("utf-8", errors="ignore").strip())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        try:
+            self.ser.cancel_read()  # Wake the thread out of its blocking readline
+        except (AttributeError, NotImplementedError):
+            pass  # Older pyserial: the thread exits after the port timeout
+        self._thread.join(timeout=self.ser.timeout)
+
+
+def wait_for_ack(ser, timeout_s=5, lines=None, ack_prefixes=_ACK_PREFIXES):
+    """
+    Waits for an ACK message (a line starting with one of ack_prefixes) from
+    the Arduino. Lines are read from the port, or taken from the lines queue
+    when a SerialLineReader owns the port.
+    """
+    log.debug("[RECV] Waiting for ACK...")
+    deadline = time.monotonic() + timeout_s
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if lines is not None:
+                try:
+                    line = lines.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            else:
+                # Block in the driver until a line arrives rather than polling.
+                ser.timeout = remaining
+                raw = ser.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", errors="ignore").strip()
+            log.debug("[RECV] Line: '%s'", line)
+            if line.startswith(ack_prefixes):
+                log.debug("[RECV] ACK received.")
                 return True
-            elif "ERR:" in line or "error" in line:
-                print(f"[RECV] Error detected: {line}")
+            elif line.startswith(_ERR_PREFIXES):
+                log.warning("[RECV] Error detected: %s", line)
                 return False
-        time.sleep(0.001)
-    print("[RECV] Timeout: No ACK received.")
+    finally:
+        if lines is None:
+            ser.timeout = port_timeout
+    log.warning("[RECV] Timeout: No ACK received.")
     return False
 
 
 # --- Arduino Data Fetching Functions ---
 
 
+def json_depth_delta(line):
+    """
+    Returns how many '{'/'[' the line opens minus how many it closes, ignoring
+    brackets inside JSON strings (which can't span lines).
+    """
+    bare = JSON_STRING_RE.sub("", line)
+    return bare.count("{") + bare.count("[") - bare.count("}") - bare.count("]")
+
+
+def parse_json(text):
+    """
+    Parses a complete JSON reply (str or UTF-8 bytes) into plain dicts and
+    lists, using the reusable simdjson parser when available and the json
+    module otherwise. Raises ValueError on invalid JSON.
+    """
+    if _json_parser is None:
+        return json.loads(text)
+    doc = _json_parser.parse(
+        text.encode("utf-8") if isinstance(text, str) else bytes(text)
+    )
+    # Materialize now: the next parse() invalidates this document's proxies.
+    if isinstance(doc, simdjson.Object):
+        return doc.as_dict()
+    if isinstance(doc, simdjson.Array):
+        return doc.as_list()
+    return doc
+
+
 def read_json_response(ser, timeout_s=15):
     """
     Reads lines from serial until a complete, valid JSON object is received or timeout.
     This version is more robust by strictly filtering for JSON start characters.
     """
-    json_str_buffer = ""
-    start_time = time.time()
+    json_buffer = bytearray()  # Raw bytes of the JSON lines received so far
+    depth = 0  # Open brackets/braces in json_buffer not yet closed
+    start_time = time.monotonic()
 
-    while time.time() - start_time < timeout_s:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode("utf-8", errors="ignore").strip()
-            print(f"[RECV] Line: '{line}'")  # Always print the raw line for debugging
+    port_timeout = ser.timeout
+    try:
+        while True:
+            remaining = timeout_s - (time.monotonic() - start_time)
+            if remaining <= 0:
+                break
+            # Block in the driver until a line arrives rather than polling.
+            ser.timeout = remaining
+            raw = ser.readline().strip()
+            if not raw:
+                continue
+            line = raw.decode("utf-8", errors="ignore")
+            log.debug("[RECV] Line: '%s'", line)
 
             # Reset timeout if any data is coming in
-            start_time = time.time()
+            start_time = time.monotonic()
 
             # Only consider lines that start with '{' or '[' as potential JSON.
             if line.startswith("{") or line.startswith("["):
-                json_str_buffer += line
-                try:
-                    parsed_json = json.loads(json_str_buffer)
-                    return parsed_json  # Successfully parsed, return it!
-                except json.JSONDecodeError:
-                    # Not a complete or valid JSON yet, keep buffering
-                    pass
+                json_buffer += raw
+                depth += json_depth_delta(line)
+                # Only attempt a parse once the brackets balance, instead of
+                # re-parsing the growing buffer after every line.
+                if depth <= 0:
+                    try:
+                        parsed_json = parse_json(json_buffer)
+                        return parsed_json  # Successfully parsed, return it!
+                    except ValueError:
+                        # Not a complete or valid JSON yet, keep buffering
+                        pass
             else:
                 # If it's not a JSON start, discard this line.
                 # If we had partial JSON, and this is NOT JSON, it implies corruption.
-                if json_str_buffer:
-                    print(
-                        f"[RECV] Discarding non-JSON line after partial JSON. Buffer reset."
+                if json_buffer:
+                    log.debug(
+                        "[RECV] Discarding non-JSON line after partial JSON. Buffer reset."
                     )
-                    json_str_buffer = ""  # Discard corrupted buffer.
+                    json_buffer.clear()  # Discard corrupted buffer.
+                    depth = 0
                 # Otherwise, it's just a debug line before any JSON started, so simply discard.
-
-        time.sleep(0.001)  # Small delay
+    finally:
+        ser.timeout = port_timeout
 
     print(
-        f"Timeout: Did not receive full JSON within {timeout_s} seconds. Current buffer: '{json_str_buffer}'"
+        f"Timeout: Did not receive full JSON within {timeout_s} seconds. Current buffer: {bytes(json_buffer)!r}"
     )
     return None
 
@@ -160,14 +436,14 @@ def get_available_effects(ser):
     available_effects = []
 
     print("\n--- Fetching All Effects (Binary Protocol) ---")
-    ser.flushInput()  # Clear buffer before sending command
+    drain_stale_input(ser)  # Stale text would corrupt the binary count header
 
     # 1. Send the text command to SerialCommandHandler to initiate the binary transfer
     send_command(ser, "getalleffects\n")
 
     # 2. Read the 3-byte binary effect count (CMD_GET_ALL_EFFECTS + 2 bytes for count)
     # The Arduino sends this immediately after processing the text command.
-    print("[RECV] Waiting for binary effect count header...")
+    log.debug("[RECV] Waiting for binary effect count header...")
     response_bytes = read_exact_bytes(ser, 3)
     if (
         not response_bytes or response_bytes[0] != CMD_GET_ALL_EFFECTS
@@ -177,20 +453,18 @@ def get_available_effects(ser):
         )
         return []
 
-    effect_count = struct.unpack(">H", response_bytes[1:])[
-        0
-    ]  # Unpack big-endian unsigned short
+    (effect_count,) = U16_BE.unpack_from(response_bytes, 1)
     print(f"Expected {effect_count} effects to receive.")
 
     # 3. Send ACK_GENERIC after receiving the count header. The Arduino expects this ACK
     # before sending the *first* effect's JSON.
-    send_binary_command(ser, CMD_ACK_GENERIC)
+    ser.write(_ACK_BYTES)
     time.sleep(
         0.05
     )  # Small delay to ensure Arduino processes ACK before sending next data
 
     # 4. Loop to receive each effect's JSON and send an ACK
-    print("\n[RECV] Waiting for individual effect JSONs...")
+    log.debug("[RECV] Waiting for individual effect JSONs...")
     for i in range(effect_count):
         # We expect a JSON string, which is text, so use read_json_response
         effect_json_response = read_json_response(ser)
@@ -198,23 +472,21 @@ def get_available_effects(ser):
             effect_name = effect_json_response.get("effect")
             if effect_name:
                 available_effects.append(effect_name)
-                print(f"Received effect {i+1}: '{effect_name}'")
+                log.debug("Received effect %d: '%s'", i + 1, effect_name)
 
                 # Send ACK_GENERIC for each received effect JSON.
                 # The Arduino waits for this ACK before sending the *next* effect.
-                send_binary_command(ser, CMD_ACK_GENERIC)
+                ser.write(_ACK_BYTES)
                 time.sleep(0.05)  # Small delay to ensure ACK is processed by Arduino
             else:
                 print(
                     f"Warning: Received effect JSON without 'effect' key for item {i+1}. JSON: {effect_json_response}"
                 )
-                send_binary_command(
-                    ser, CMD_ACK_GENERIC
-                )  # Still send ACK to not block the Arduino
+                ser.write(_ACK_BYTES)  # Still send ACK to not block the Arduino
         else:
             print(f"Failed to receive JSON for effect {i+1}. Aborting effect fetching.")
             # Even if we fail to read, try to send an ACK to avoid blocking the Arduino indefinitely
-            send_binary_command(ser, CMD_ACK_GENERIC)
+            ser.write(_ACK_BYTES)
             return available_effects  # Return what we have so far
 
     # After all effects are sent and ACKed, the Arduino sends a final "OK: All effects sent." message.
@@ -227,11 +499,15 @@ def get_available_effects(ser):
 
 
 def get_effect_info(ser, effect_name):
-    """Fetches parameter info for a specific effect from the Arduino."""
-    ser.flushInput()  # Clear buffer before sending command
+    """
+    Fetches parameter info for a specific effect from the Arduino. Successful
+    replies are kept in _effect_info_cache and served from there afterwards.
+    """
+    if effect_name in _effect_info_cache:
+        return _effect_info_cache[effect_name]
     command = f"geteffectinfo 0 {effect_name}\n"  # Use segment 0 as a dummy
     send_command(ser, command)
-    print(f"Waiting for effect info for '{effect_name}' from Arduino...")
+    log.debug("Waiting for effect info for '%s' from Arduino...", effect_name)
 
     response_json = read_json_response(ser)
 
@@ -244,33 +520,83 @@ def get_effect_info(ser, effect_name):
             return []
 
         params = response_json.get("params", [])
+        _effect_info_cache[effect_name] = params
         return params
     else:
         print(f"Failed to receive valid effect info JSON for '{effect_name}'.")
         return []
 
 
+def get_effect_infos(ser, effect_names, group_size=EFFECT_INFO_GROUP_SIZE):
+    """
+    Fetches parameter info for several effects by pipelining 'geteffectinfo'
+    commands: each group is written in one go and the replies read back in
+    order. Replies are matched by their 'effect' key, and any effect whose
+    reply did not arrive is retried on its own with get_effect_info. Effects
+    already in _effect_info_cache (e.g. from an earlier test mode) aren't
+    requested again.
+    """
+    effect_param_info = {
+        name: _effect_info_cache[name]
+        for name in effect_names
+        if name in _effect_info_cache
+    }
+    missing = [name for name in effect_names if name not in effect_param_info]
+    for start in range(0, len(missing), group_size):
+        group = missing[start : start + group_size]
+        commands = "".join(f"geteffectinfo 0 {name}\n" for name in group)
+        log.debug("[SEND] Pipelined %d commands: %s", len(group), ", ".join(group))
+        ser.write(commands.encode("utf-8"))
+
+        for _ in group:
+            response_json = read_json_response(ser)
+            if not response_json:
+                break
+            name = response_json.get("effect")
+            if name in group:
+                effect_param_info[name] = response_json.get("params", [])
+                _effect_info_cache[name] = effect_param_info[name]
+
+        for name in group:
+            if name not in effect_param_info:
+                print(f"No pipelined reply for '{name}', requesting it on its own.")
+                effect_param_info[name] = get_effect_info(ser, name)
+    return effect_param_info
+
+
 # --- Test Functions ---
-def set_single_segment_config(ser, segment_data):
-    """Sends 'setsegmentjson' with the given segment data."""
+def segment_json(segment_data):
+    """
+    Returns the segment's compact JSON as UTF-8 bytes, encoded with msgspec
+    when it is installed.
+    """
+    if _json_encoder is not None:
+        return _json_encoder.encode(segment_data)
+    return _compact_json_encode(segment_data).encode("utf-8")
+
+
+def set_single_segment_config(ser, segment_data, payload=None):
+    """
+    Sends 'setsegmentjson' with the given segment data. 'payload' is the
+    segment's already encoded JSON, if the caller has it.
+    """
     print(
         f"\n--- Sending Single Segment Configuration for ID: {segment_data['id']} ---"
     )
-    json_payload = json.dumps(segment_data)
-    command = f"setsegmentjson {json_payload}\n"
+    if payload is None:
+        payload = segment_json(segment_data)
+    command = b"setsegmentjson " + payload + b"\n"
     send_command(ser, command)
-    # The firmware does not send a specific ACK for this command,
-    # but we can check for the "OK: Segment..." debug message.
-    # A short delay is often sufficient.
-    time.sleep(0.2)
-    return True
+    # The firmware does not send a specific ACK for this command, but it
+    # reports "OK: Segment ID ... config applied." or an "ERR:" line, so
+    # return as soon as one of those arrives instead of sleeping.
+    return wait_for_ack(ser, timeout_s=1)
 
 
 def get_all_segment_configs(ser):
     """Sends 'getallsegmentconfigs' and receives all segment JSONs."""
     all_segments_data = []
 
-    ser.flushInput()  # Clear buffer before sending command
     send_command(ser, "getallsegmentconfigs\n")
 
     print("Waiting for segment configurations JSON from Arduino...")
@@ -285,51 +611,129 @@ def get_all_segment_configs(ser):
         return None
 
 
-def set_all_segment_configs(ser, segments_to_send):
-    """Sends 'setallsegmentconfigs' and then the segment data."""
+def send_framed_segment_configs(ser, payloads):
+    """
+    Uploads the encoded segments with 'setallsegmentsframed': the segment
+    count and every segment as a 2-byte length plus its JSON go out in one
+    write, and the firmware acknowledges only the completed batch. Returns True or False
+    for the upload's result, or None if the firmware doesn't support the
+    command so the caller can use the per-segment ACK protocol instead.
+    """
+    drain_stale_input(ser)
+    send_command(ser, b"setallsegmentsframed\n")
+    if not wait_for_ack(ser, ack_prefixes=("-> Ready for framed segment data",)):
+        print("Framed upload not available; using per-segment ACKs.")
+        return None
+
+    frames = [U16_BE.pack(len(payload)) + payload for payload in payloads]
+    stream = U16_BE.pack(len(payloads)) + b"".join(frames)
+    log.debug(
+        "[SEND] %d framed segments in one write (%d bytes)",
+        len(payloads),
+        len(stream),
+    )
+    ser.write(stream)
+    return wait_for_ack(
+        ser,
+        timeout_s=5 + 0.1 * len(payloads),
+        ack_prefixes=("OK: All segment configurations received",),
+    )
+
+
+def set_all_segment_configs(ser, segments_to_send, payloads=None):
+    """
+    Uploads all segment configurations, as one framed stream when the
+    firmware supports it and otherwise with 'setallsegmentconfigs' and one
+    ACK per segment. 'payloads' holds the segments' encoded JSON in the same
+    order, if the caller has already built it.
+    """
     print("\n--- Initiating Set All Segment Configurations ---")
 
-    # 1. Send the initial command (text command to SerialCommandHandler)
-    ser.flushInput()  # Clear buffer before sending command
-    send_command(ser, "setallsegmentconfigs\n")
-    if not wait_for_ack(ser):
-        print("Failed to receive ACK for setallsegmentconfigs command initiation.")
-        return False
+    if payloads is None:
+        payloads = [segment_json(segment_data) for segment_data in segments_to_send]
 
-    # 2. Send the 2-byte segment count (binary data)
-    num_segments = len(segments_to_send)
-    count_bytes = struct.pack(
-        ">H", num_segments
-    )  # >H means Big-endian, unsigned short (2 bytes)
-    print(f"[SEND] Segment Count: {num_segments} | Bytes: {count_bytes.hex()}")
-    ser.write(count_bytes)
+    framed_result = send_framed_segment_configs(ser, payloads)
+    if framed_result is not None:
+        if framed_result:
+            print("\n--- All segment configurations sent successfully! ---")
+        return framed_result
 
-    if not wait_for_ack(ser):
-        print("Failed to receive ACK for segment count.")
-        return False
-
-    # 3. Send each segment's JSON configuration (text data)
-    print(f"\nSending {num_segments} segment configurations...")
-    for i, segment_data in enumerate(segments_to_send):
-        ser.flushInput()  # Clear buffer before sending each segment JSON
-        json_segment = (
-            json.dumps(segment_data) + "\n"
-        )  # Add newline for readline on Arduino
-        print(f"[SEND] Segment {i+1}/{num_segments} JSON: '{json_segment.strip()}'")
-        ser.write(json_segment.encode("utf-8"))
-
-        # Wait for ACK for each segment
-        if not wait_for_ack(ser):
-            print(f"Failed to receive ACK for segment {i+1}. Aborting.")
+    # 1. Send the initial command (text command to SerialCommandHandler) and
+    # 2. the 2-byte segment count (binary data) in a single write. The firmware
+    # reads the command line up to its newline and leaves the count bytes
+    # buffered until the batch transfer it starts picks them up.
+    drain_stale_input(ser)  # Leftover ACK lines would be mistaken for this phase's
+    num_segments = len(segments_to_send)
+    count_bytes = U16_BE.pack(num_segments)
+    log.debug(
+        "[SEND] Command: 'setallsegmentconfigs' + Segment Count: %d | Bytes: %s",
+        num_segments,
+        HexBytes(count_bytes),
+    )
+    with SerialLineReader(ser) as reader:
+        ser.write(b"setallsegmentconfigs\n" + count_bytes)
+
+        # 3. Send every segment's JSON configuration (text data) one write
+        # each. The firmware parses one JSON object per receive, so each
+        # segment is still ACK-gated.
+        if not wait_for_ack(ser, lines=reader.lines):
+            print("Failed to receive ACK for setallsegmentconfigs command initiation.")
             return False
+        if not wait_for_ack(ser, lines=reader.lines):
+            print("Failed to receive ACK for segment count.")
+            return False
+
+        print(f"\nSending {num_segments} segment configurations...")
+        for i, payload in enumerate(payloads):
+            log.debug("[SEND] Segment %d/%d JSON: %r", i + 1, num_segments, payload)
+            ser.write(payload + b"\n")  # Newline for Arduino
+
+            # Wait for ACK for each segment
+            if not wait_for_ack(ser, lines=reader.lines):
+                print(f"Failed to receive ACK for segment {i+1}. Aborting.")
+                return False
 
-        print(f"Successfully sent segment {i+1}.")
-        time.sleep(0.05)  # Small delay between segments
+            log.debug("Successfully sent segment %d.", i + 1)
 
     print("\n--- All segment configurations sent successfully! ---")
     return True
 
 
+def make_param_generator(param):
+    """
+    Returns a callable mapping a uniform draw in [0, 1) to a value within the
+    parameter's range, or None for an unknown parameter type.
+    """
+    param_type = param["type"]
+    min_val = param.get("min_val")
+    max_val = param.get("max_val")
+
+    if param_type == "integer":
+        low = int(min_val if min_val is not None else 0)
+        span = int(max_val if max_val is not None else 255) - low + 1
+        return lambda u: low + int(u * span)
+    elif param_type == "float":
+        low = min_val if min_val is not None else 0.0
+        high = max_val if max_val is not None else 1.0
+        return lambda u: round(low + u * (high - low), 2)
+    elif param_type == "color":
+        return lambda u: int(u * 0x1000000)
+    elif param_type == "boolean":
+        return lambda u: u < 0.5
+    return None
+
+
+def uniform_draws(count):
+    """
+    Returns an iterator over count uniform values in [0, 1). Large batches come
+    from one NumPy call when NumPy is installed; below NUMPY_MIN_DRAWS the
+    array setup costs more than calling random.random per value.
+    """
+    if np is not None and count >= NUMPY_MIN_DRAWS:
+        return iter(np.random.default_rng().random(count).tolist())
+    return iter([random.random() for _ in range(count)])
+
+
 def generate_test_segments(ser, led_count=45):
     """
     Generates a set of test segments, ensuring one segment is created for
@@ -344,9 +748,13 @@ def generate_test_segments(ser, led_count=45):
         return []
 
     # Get detailed parameter info for each effect
-    effect_param_info = {}
-    for effect_name in available_effects:
-        effect_param_info[effect_name] = get_effect_info(ser, effect_name)
+    effect_param_info = get_effect_infos(ser, available_effects)
+
+    # Bind a value generator to each parameter once, up front
+    effect_generators = {}
+    for name, params in effect_param_info.items():
+        generators = [(param["name"], make_param_generator(param)) for param in params]
+        effect_generators[name] = [(n, g) for n, g in generators if g is not None]
 
     # Filter out static effects to get the list of effects to test
     dynamic_effects = [e for e in available_effects if e not in ["None", "SolidColor"]]
@@ -357,6 +765,11 @@ def generate_test_segments(ser, led_count=45):
     # Shuffle the list to randomize the order of effects
     random.shuffle(dynamic_effects)
 
+    # Draw every parameter's random value up front in one batch
+    draws = uniform_draws(
+        sum(len(effect_generators.get(name, ())) for name in dynamic_effects)
+    )
+
     # Segment 0: The "all" segment (always present)
     segments.append(
         {
@@ -397,30 +810,8 @@ def generate_test_segments(ser, led_count=45):
         }
 
         # Add random parameters for the assigned effect
-        if effect_name in effect_param_info:
-            for param in effect_param_info[effect_name]:
-                param_name = param["name"]
-                param_type = param["type"]
-                min_val = param.get("min_val")
-                max_val = param.get("max_val")
-
-                if param_type == "integer":
-                    segment[param_name] = random.randint(
-                        int(min_val if min_val is not None else 0),
-                        int(max_val if max_val is not None else 255),
-                    )
-                elif param_type == "float":
-                    segment[param_name] = round(
-                        random.uniform(
-                            min_val if min_val is not None else 0.0,
-                            max_val if max_val is not None else 1.0,
-                        ),
-                        2,
-                    )
-                elif param_type == "color":
-                    segment[param_name] = random.randint(0, 0xFFFFFF)
-                elif param_type == "boolean":
-                    segment[param_name] = random.choice([True, False])
+        for param_name, generate in effect_generators.get(effect_name, ()):
+            segment[param_name] = generate(next(draws))
 
         segments.append(segment)
         current_led_start = end_led + 1
@@ -445,8 +836,9 @@ def main():
     parser.add_argument(
         "--baud",
         type=int,
-        default=115200,
-        help="The baud rate for the serial connection (default: 115200)",
+        default=921600,
+        help="The baud rate for the serial connection (default: 921600). Must match "
+        "the sketch's Serial.begin on UART bridges; USB CDC boards ignore it.",
     )
     parser.add_argument(
         "--mode",
@@ -461,8 +853,21 @@ def main():
         default=45,
         help="The total number of LEDs on the strip. Used for generating test segment ranges.",
     )
+    parser.add_argument(
+        "--fresh-random",
+        action="store_true",
+        help="Generate new random segments for each SET test instead of reusing "
+        "the first set.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log every line sent and received on the serial port.",
+    )
     args = parser.parse_args()
 
+    configure_logging(args.verbose)
+
     # Initialize test results
     get_test_status = "NOT RUN"
     get_test_reason = ""
@@ -477,8 +882,12 @@ def main():
     ser = None
     try:
         ser = serial.Serial(args.port, args.baud, timeout=5)
-        time.sleep(3)
-        ser.flushInput()
+        if not wait_for_sketch_ready(ser):
+            print("Warning: No reply to 'ping' yet; continuing anyway.")
+        enable_low_latency(ser)
+        # Drop boot output and extra ping replies once, up front; the helpers
+        # after this rely on strict request/response pairing.
+        drain_stale_input(ser, quiet_s=0.05)
         print("Connection established and buffer flushed.")
     except serial.SerialException as e:
         print(f"Error opening serial port: {e}")
@@ -495,6 +904,12 @@ def main():
         else:
             modes_to_run = [args.mode]
 
+        # Segments generated for the first SET test and reused by the next one,
+        # unless --fresh-random asks for a new random set each time
+        test_segments = None
+        # Their encoded JSON, built once alongside them and kept in the same order
+        test_payloads = None
+
         # --- Execute Tests ---
         for mode in modes_to_run:
             if mode == "get":
@@ -511,14 +926,17 @@ def main():
                 except Exception as e:
                     get_test_status = "FAILED"
                     get_test_reason = f"Exception during GET test: {e}"
+                flush_log()
                 time.sleep(1)
 
             elif mode == "set":
                 print("\n--- Running SET (All) Test ---")
                 try:
-                    test_segments = generate_test_segments(ser, args.led_count)
+                    if not test_segments or args.fresh_random:
+                        test_segments = generate_test_segments(ser, args.led_count)
+                        test_payloads = [segment_json(s) for s in test_segments or ()]
                     if test_segments:
-                        if set_all_segment_configs(ser, test_segments):
+                        if set_all_segment_configs(ser, test_segments, test_payloads):
                             set_test_status = "PASSED"
                         else:
                             set_test_status = "FAILED"
@@ -529,18 +947,21 @@ def main():
                 except Exception as e:
                     set_test_status = "FAILED"
                     set_test_reason = f"Exception during SET test: {e}"
+                flush_log()
                 time.sleep(1)
 
             elif mode == "set_single":
                 print("\n--- Running SET (Single) Test ---")
                 try:
-                    # Generate a new set of random segments for this test
-                    test_segments = generate_test_segments(ser, args.led_count)
+                    # Reuse the SET (All) test's segments if it already ran
+                    if not test_segments or args.fresh_random:
+                        test_segments = generate_test_segments(ser, args.led_count)
+                        test_payloads = [segment_json(s) for s in test_segments or ()]
                     if test_segments:
                         all_sent_ok = True
                         # Iterate through all generated segments including 'all'
-                        for segment in test_segments:
-                            if not set_single_segment_config(ser, segment):
+                        for segment, payload in zip(test_segments, test_payloads):
+                            if not set_single_segment_config(ser, segment, payload):
                                 all_sent_ok = False
                                 set_single_test_reason = (
                                     f"Failed on segment ID {segment['id']}"
@@ -557,6 +978,7 @@ def main():
                 except Exception as e:
                     set_single_test_status = "FAILED"
                     set_single_test_reason = f"Exception during SET_SINGLE test: {e}"
+                flush_log()
                 time.sleep(1)
 
         # --- Verification Step ---
@@ -581,6 +1003,7 @@ def main():
     except Exception as e:
         print(f"An unexpected error occurred during test execution: {e}")
     finally:
+        flush_log()
         if ser and ser.is_open:
             ser.close()
             print("\nSerial port closed.")
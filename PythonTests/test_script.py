@@ -12,12 +12,69 @@ import argparse
 import serial
 import time
 import json
+import re
 import sys
 import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson  # Optional: faster JSON encoding and parsing
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Optional (pip install ijson): streaming JSON parser, to count items without a full parse
+except ImportError:
+    ijson = None
 
 BAUD = 115200
-DELAY = 0.35  # Increased delay slightly for visual confirmation
+DELAY = 0.35  # longest wait for a response to start
 DEFAULT_LED_COUNT = 45  # The default value in the firmware
+RESTART_GRACE = 0.5  # the firmware resets 200 ms after announcing a restart
+RESTART_TIMEOUT = 10  # longest wait for a restarted device to answer again
+MAX_COMMAND_LENGTH = 255  # the firmware reads command lines into a 256-byte buffer
+SETPARAMS_MAX_PAIRS = 16  # most parameters the firmware takes in one setparams line
+QUIET = False  # set by --quiet: don't print each command's exchange
+DEVICE_READY_MSG = b"Setup complete. Entering main loop..."  # printed at the end of setup()
+READ_IDLE_TIMEOUT = 0.05  # silence on the line that marks the end of a text response
+
+# Where --effects-cache keeps parameter lists when no file is named
+DEFAULT_EFFECTS_CACHE = os.path.join(
+    os.path.expanduser("~"), ".cache", "rave_test", "effects.json"
+)
+
+# Parameter lists per effect name, filled by get_effect_params. Effects are
+# compiled into the firmware, so their parameters don't change during a run.
+_effect_params_cache = {}
+
+# Firmware status lines start with "OK:" or "ERR:"; a response may hold other
+# lines before them, so each pattern matches at the start of any line
+OK_LINE_RE = re.compile(r"^OK", re.MULTILINE)
+ERR_LINE_RE = re.compile(r"^ERR", re.MULTILINE)
+
+# batchconfig's reply on firmware that echoes the resulting segment count,
+# including the "all" segment
+BATCH_APPLIED_RE = re.compile(
+    r"^OK: Batch configuration applied \((\d+) segments\)", re.MULTILINE
+)
+# A JSON string literal, escapes included
+JSON_STRING_RE = re.compile(rb'"(?:[^"\\]|\\.)*"')
+# getledcount's reply
+LED_COUNT_RE = re.compile(r"^LED_COUNT:\s*(\d+)", re.MULTILINE)
+
+# Wire format of the set_parameter JSON command; only the JSON-encoded effect
+# name, parameter name and value vary between calls
+SET_PARAMETER_TEMPLATE = (
+    '{"set_parameter":{"segment_id":0,"effect":%s,"name":%s,"value":%s}}'
+)
+# Wire format of the get_parameters JSON command, given the JSON-encoded effect name
+GET_PARAMETERS_TEMPLATE = '{"get_parameters":%s}'
+
+# Sent after each pipelined command; its reply marks where that command's
+# response ends. Firmware without 'ping' rejects it, which marks it just as well.
+SENTINEL_CMD = "ping"
+SENTINEL_REPLIES = ("OK: pong", "ERR: Unknown command 'ping'")
 
 # A list of basic commands to test the core text API
 ASCII_COMMANDS_TO_TEST = [
@@ -30,61 +87,390 @@ ASCII_COMMANDS_TO_TEST = [
 ]
 
 
+def to_json(obj):
+    """Returns obj as compact JSON text, encoded with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def parse_json(text):
+    """
+    Parses JSON text or bytes, with orjson when installed. Raises
+    json.JSONDecodeError if invalid (orjson's error subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def count_json_items(text, prefix):
+    """
+    Counts the elements of the array at an ijson prefix (e.g. 'segments.item'
+    for the top-level "segments" array) without building the document when
+    ijson is installed. A missing array counts as 0. Raises ValueError if
+    the JSON is invalid.
+    """
+    if ijson is None:
+        data = parse_json(text)
+        for key in prefix.split(".")[:-1]:
+            data = data.get(key, [])
+        return len(data)
+    # Apart from map keys and closing events, each element produces exactly
+    # one event at the item prefix itself
+    try:
+        return sum(
+            1
+            for event_prefix, event, _ in ijson.parse(text.encode("utf-8"))
+            if event_prefix == prefix
+            and event not in ("map_key", "end_map", "end_array")
+        )
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+
+
+def json_item_field(text, prefix, index, field):
+    """
+    Returns the scalar field of the index-th element of the array at an
+    ijson prefix (e.g. 'segments.item'), stopping at that element instead of
+    building the whole document when ijson is installed. Raises IndexError
+    or KeyError if the element or field is missing, and ValueError if the
+    JSON is invalid.
+    """
+    if ijson is None:
+        data = parse_json(text)
+        for key in prefix.split(".")[:-1]:
+            data = data[key]
+        return data[index][field]
+    field_prefix = f"{prefix}.{field}"
+    position = -1
+    try:
+        for event_prefix, event, value in ijson.parse(text.encode("utf-8")):
+            if event_prefix == prefix and event == "start_map":
+                position += 1
+                if position > index:
+                    raise KeyError(field)
+            elif event_prefix == field_prefix and position == index and event != "map_key":
+                return value
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+    if position < index:
+        raise IndexError(f"list index {index} out of range")
+    raise KeyError(field)
+
+
+def is_compact_json(raw):
+    """True if JSON bytes have no whitespace outside their strings."""
+    return not re.search(rb"\s", JSON_STRING_RE.sub(b'""', raw))
+
+
+def set_usb_latency_timer(port, ms=1):
+    """
+    Writes the USB-serial adapter's latency timer (FTDI and similar, 16 ms by
+    default) through sysfs on Linux. Returns True if it was set; native
+    CDC-ACM ports have no such timer.
+    """
+    name = os.path.basename(os.path.realpath(port))
+    try:
+        with open(f"/sys/bus/usb-serial/devices/{name}/latency_timer", "w") as f:
+            f.write(str(ms))
+        return True
+    except OSError:
+        return False  # Not a usb-serial device, or no write permission
+
+
+def enable_low_latency(ser):
+    """
+    Makes the driver hand each reply over as soon as it arrives instead of
+    holding it for the USB-serial latency timer. On Windows, set the COM
+    port's "Latency Timer" to 1 ms in Device Manager (Port Settings >
+    Advanced) instead.
+    """
+    try:
+        ser.set_low_latency_mode(True)
+    except (AttributeError, ValueError, OSError, NotImplementedError):
+        pass  # Only supported on Linux
+    if sys.platform.startswith("linux"):
+        if set_usb_latency_timer(ser.port):
+            print("      USB latency timer set to 1 ms.")
+    else:
+        print("      Hint: set the serial adapter's latency timer to 1 ms for faster replies.")
+
+
 def read_all(ser):
-    """Reads all available data from the serial port with a timeout."""
-    data = b""
-    start_time = time.time()
-    while time.time() - start_time < DELAY:
-        if ser.in_waiting > 0:
-            data += ser.read(ser.in_waiting)
-        else:
-            time.sleep(0.01)
+    """
+    Reads one command's response. Blocks up to DELAY for the first line, then
+    returns as soon as a JSON response's brackets balance, or once a text
+    response has been followed by READ_IDLE_TIMEOUT of silence. A status line
+    doesn't end the response on its own: some handlers print more than one
+    (saveconfig reports "OK: Config saved." twice).
+    """
+    data = bytearray()
+    depth = 0  # Open '{'/'[' of a JSON response not yet closed
+    port_timeout = ser.timeout
+    ser.timeout = DELAY
+    try:
+        line = ser.readline()
+        while line:
+            data += line
+            stripped = line.strip()
+            if depth > 0 or stripped.startswith((b"{", b"[")):
+                depth += stripped.count(b"{") + stripped.count(b"[")
+                depth -= stripped.count(b"}") + stripped.count(b"]")
+                if depth <= 0:
+                    break  # Complete JSON response
+            # Inside a JSON response keep the full bound; otherwise a short
+            # silence means the text response is over.
+            ser.timeout = DELAY if depth > 0 else READ_IDLE_TIMEOUT
+            line = ser.readline()
+    finally:
+        ser.timeout = port_timeout
     return data.decode("utf-8", errors="ignore").strip()
 
 
 def send_command(ser, command, quiet=False):
-    """Sends a command (string or dict) and returns the response."""
+    """
+    Sends a command (string or dict) and returns the response. Unless quiet
+    (or the run-wide QUIET), the exchange is printed with one write.
+    """
     if isinstance(command, dict):
-        payload = json.dumps(command)
+        payload = to_json(command)
     else:
         payload = command
 
-    if not quiet:
-        print(f">>> SEND: {payload[:100]}{'...' if len(payload) > 100 else ''}")
-
     ser.write((payload + "\n").encode())
-    time.sleep(DELAY)
     resp = read_all(ser)
 
-    if not quiet:
-        print(f"<<< RECV: {resp or '<no response>'}")
-        print("-" * 20)
+    if not (quiet or QUIET):
+        sys.stdout.write(
+            f">>> SEND: {payload[:100]}{'...' if len(payload) > 100 else ''}\n"
+            f"<<< RECV: {resp or '<no response>'}\n"
+            f"{'-' * 20}\n"
+        )
 
     return resp
 
+def send_pipeline(ser, commands):
+    """
+    Writes all commands at once, each followed by a 'ping' whose reply marks
+    the end of that command's response, then reads the replies back. Returns
+    one response per command ("" for any that never completed).
+    """
+    ser.write("".join(f"{command}\n{SENTINEL_CMD}\n" for command in commands).encode())
+    responses = []
+    lines = []
+    while len(responses) < len(commands):
+        raw = ser.readline()  # Bounded by the port timeout
+        if not raw:
+            break
+        line = raw.decode("utf-8", errors="ignore").strip()
+        if line.startswith(SENTINEL_REPLIES):
+            responses.append("\n".join(lines))
+            lines = []
+        elif line:
+            lines.append(line)
+    if len(responses) < len(commands):
+        responses.append("\n".join(lines))
+    responses += [""] * (len(commands) - len(responses))
+    return responses
+
+def set_quiet(quiet):
+    """Sets QUIET in a worker process, which doesn't run __main__."""
+    global QUIET
+    QUIET = quiet
+
+
+class PortOutput:
+    """
+    Stands in for sys.stdout in a parallel worker: prefixes every line with
+    the worker's port and holds complete lines until flush(), which writes
+    them in one go so workers' output interleaves only in whole blocks.
+    """
+
+    def __init__(self, stream, port):
+        self.stream = stream
+        self.prefix = f"[{port}] "
+        self.lines = []
+        self.partial = ""
+
+    def write(self, text):
+        *complete, self.partial = (self.partial + text).split("\n")
+        self.lines.extend(f"{self.prefix}{line}\n" for line in complete)
+        return len(text)
+
+    def flush(self):
+        if self.lines:
+            self.stream.write("".join(self.lines))
+            self.lines = []
+        self.stream.flush()
+
+
+def run_port_tests(port, *args):
+    """Runs run_all_tests in a parallel worker, with its output labelled by port."""
+    output = PortOutput(sys.stdout, port)
+    sys.stdout = output
+    try:
+        return run_all_tests(port, *args)
+    finally:
+        if output.partial:
+            output.write("\n")
+        output.flush()
+        sys.stdout = output.stream
+
 def wait_for_device_ready(ser, timeout=10):
     """Reads from serial until the 'setup complete' message is seen or timeout occurs."""
     print("      Waiting for device to be ready...")
-    start_time = time.time()
-    buffer = ""
-    while time.time() - start_time < timeout:
-        if ser.in_waiting > 0:
-            buffer += ser.read(ser.in_waiting).decode("utf-8", errors="ignore")
-            if "Setup complete. Entering main loop..." in buffer:
+    sys.stdout.flush()
+    port_timeout = ser.timeout
+    ser.timeout = max(0, timeout)
+    try:
+        # Blocks until the banner has arrived, even split across reads, or
+        # the timeout runs out
+        data = ser.read_until(DEVICE_READY_MSG)
+    finally:
+        ser.timeout = port_timeout
+    if data.endswith(DEVICE_READY_MSG):
+        print("      Device is ready.")
+        ser.reset_input_buffer()
+        return True
+    print("      !! TIMEOUT: Did not receive ready signal from device.")
+    return False
+
+def load_effect_params_cache(path, firmware_key):
+    """
+    Loads the parameter lists saved by an earlier run against the same
+    effect list (firmware_key). Returns the whole file's data, which holds
+    one entry per firmware_key; a missing or unreadable file is empty.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = parse_json(f.read())
+    except (OSError, ValueError):
+        data = {}
+    _effect_params_cache.update(data.get(firmware_key, {}))
+    return data
+
+
+def save_effect_params_cache(path, firmware_key, data):
+    """Stores this run's parameter lists under firmware_key in the cache file."""
+    data[firmware_key] = dict(_effect_params_cache)
+    # Write a temporary file and swap it in, so parallel runs sharing the
+    # cache (one per port) never leave it half-written
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            f.write(to_json(data))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  Warning: Could not write effect cache '{path}': {e}")
+
+
+def load_passed_effects(path, mode):
+    """
+    Returns the effects recorded as passing in mode by earlier runs in the
+    results log, so they can be skipped. A missing log has none; a line cut
+    short by a crash is ignored.
+    """
+    passed = set()
+    try:
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    result = parse_json(line)
+                except ValueError:
+                    continue
+                if result.get("mode") == mode and result.get("pass"):
+                    passed.add(result.get("effect"))
+    except OSError:
+        pass
+    return passed
+
+
+def record_effect_result(results_file, effect_name, mode, passed):
+    """Appends one effect's result to the results log, if one is open."""
+    if results_file:
+        results_file.write(
+            to_json({"effect": effect_name, "mode": mode, "pass": passed}) + "\n"
+        )
+
+
+def get_effect_params(ser, effect_name, effect_json=None):
+    """
+    Returns the effect's parameter list from 'get_parameters', asking the
+    device only the first time each effect is requested. effect_json is the
+    effect name already JSON-encoded, if the caller has it. Raises ValueError
+    or KeyError if the response can't be parsed.
+    """
+    params_list = _effect_params_cache.get(effect_name)
+    if params_list is None:
+        get_params_cmd = GET_PARAMETERS_TEMPLATE % (effect_json or to_json(effect_name))
+        params_response = send_command(ser, get_params_cmd, quiet=True)
+        params_list = parse_json(params_response)["params"]
+        _effect_params_cache[effect_name] = params_list
+    return params_list
+
+
+def parse_led_count(response):
+    """Returns the count from a getledcount reply; raises ValueError if absent."""
+    match = LED_COUNT_RE.search(response)
+    if not match:
+        raise ValueError("no LED_COUNT line in response")
+    return int(match.group(1))
+
+
+def wait_for_port_node(path, present, deadline):
+    """
+    Waits until the port's device node exists (or is gone) or the deadline
+    passes. Ports that aren't device nodes (e.g. COM7) return at once.
+    """
+    if not path.startswith("/dev/"):
+        return
+    while os.path.exists(path) != present and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def reconnect_after_restart(ser, timeout=RESTART_TIMEOUT):
+    """
+    Closes the port after a command that restarts the device, then reopens it
+    as soon as the device answers 'getledcount' again, retrying with a short
+    backoff instead of sleeping for a fixed worst-case time. Where the port
+    is a device node, its disappearance and return on USB re-enumeration
+    are watched for instead of waiting out RESTART_GRACE and the backoff.
+    """
+    ser.close()
+    sys.stdout.flush()  # Show what led up to the restart while waiting
+    # Don't reach the device before it resets
+    if ser.port.startswith("/dev/"):
+        wait_for_port_node(ser.port, False, time.monotonic() + RESTART_GRACE)
+    else:
+        time.sleep(RESTART_GRACE)
+    deadline = time.monotonic() + timeout
+    backoff = 0.1
+    while time.monotonic() < deadline:
+        wait_for_port_node(ser.port, True, deadline)
+        try:
+            if not ser.is_open:
+                ser.open()
+            ser.reset_input_buffer()
+            if LED_COUNT_RE.search(send_command(ser, "getledcount", quiet=True)):
                 print("      Device is ready.")
-                ser.reset_input_buffer()
                 return True
-        time.sleep(0.1)
-    print("      !! TIMEOUT: Did not receive ready signal from device.")
+        except serial.SerialException:
+            ser.close()  # The port disappears while the device re-enumerates
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 1.0)
+    print("      !! TIMEOUT: Device did not come back after restarting.")
     return False
 
+
 def test_standard_commands(ser):
     """Runs through a basic set of plain-text commands."""
     print("## Testing Standard ASCII Commands... ##")
     all_ok = True
     for cmd in ASCII_COMMANDS_TO_TEST:
         response = send_command(ser, cmd)
-        if "ERR" in response:
+        if ERR_LINE_RE.search(response):
             all_ok = False
             print(f"  !! FAIL: Command '{cmd}' returned an error.")
     if all_ok:
@@ -100,9 +486,9 @@ def test_led_count_commands(ser):
     print("  1. Getting initial LED count...")
     response = send_command(ser, "getledcount")
     try:
-        initial_count = int(response.split(":")[1].strip())
+        initial_count = parse_led_count(response)
         print(f"  -> PASS: Initial LED count is ({initial_count}).")
-    except (IndexError, ValueError) as e:
+    except ValueError as e:
         print(
             f"  !! FAIL: Could not parse initial LED count. Response: '{response}'. Error: {e}"
         )
@@ -113,22 +499,19 @@ def test_led_count_commands(ser):
     print(f"\n  2. Setting LED count to {new_count} (device will restart)...")
     send_command(ser, f"setledcount {new_count}")
 
-    ser.close()
-    time.sleep(4)
-    ser.open()
-    if not wait_for_device_ready(ser): return False
+    if not reconnect_after_restart(ser): return False
 
     # 3. Verify the new count after restart
     print("\n  3. Verifying new LED count after restart...")
     response = send_command(ser, "getledcount")
     try:
-        verified_count = int(response.split(":")[1].strip())
+        verified_count = parse_led_count(response)
         if verified_count == new_count:
             print(f"  -> PASS: LED count successfully updated to {verified_count}.")
         else:
             print(f"  !! FAIL: Expected {new_count}, but got {verified_count}.")
             return False
-    except (IndexError, ValueError) as e:
+    except ValueError as e:
         print(
             f"  !! FAIL: Could not parse verified LED count. Response: '{response}'. Error: {e}"
         )
@@ -140,19 +523,16 @@ def test_led_count_commands(ser):
     )
     send_command(ser, f"setledcount {DEFAULT_LED_COUNT}")
 
-    ser.close()
-    time.sleep(4)
-    ser.open()
-    if not wait_for_device_ready(ser): return False
+    if not reconnect_after_restart(ser): return False
     
     print("\n  5. Final verification...")
     response = send_command(ser, "getledcount", quiet=True)
     try:
-        final_count = int(response.split(":")[1].strip())
+        final_count = parse_led_count(response)
         assert final_count == DEFAULT_LED_COUNT
         print("  -> PASS: LED count restored successfully.")
         return True
-    except (AssertionError, IndexError, ValueError):
+    except (AssertionError, ValueError):
         print("  !! FAIL: Could not restore LED count to default.")
         return False
 
@@ -173,24 +553,23 @@ def test_config_persistence(ser):
     send_command(ser, "saveconfig")
     send_command(ser, f"setledcount {DEFAULT_LED_COUNT}", quiet=True)
     
-    ser.close()
-    time.sleep(4)
-    ser.open()
-    if not wait_for_device_ready(ser): return False
+    if not reconnect_after_restart(ser): return False
 
     # 3. Verify the configuration was loaded on startup
     print("\n  3. Verifying configuration after restart...")
     response = send_command(ser, "getstatus")
     try:
-        status = json.loads(response)
-        loaded_effect = status["segments"][test_segment_id]["effect"]
+        # Only one field is needed, so don't build the whole status
+        loaded_effect = json_item_field(
+            response, "segments.item", test_segment_id, "effect"
+        )
         if loaded_effect == test_effect:
             print(f"  -> PASS: Configuration persisted. Found '{loaded_effect}' on segment {test_segment_id}.")
             return True
         else:
             print(f"  !! FAIL: Configuration did not persist. Expected '{test_effect}', but found '{loaded_effect}'.")
             return False
-    except (json.JSONDecodeError, IndexError, KeyError) as e:
+    except (ValueError, IndexError, KeyError) as e:
         print(f"  !! FAIL: Could not parse or verify status after restart. Error: {e}")
         return False
 
@@ -202,36 +581,209 @@ def test_json_upload(ser, json_file_path):
         return False
 
     try:
-        with open(json_file_path, "r") as f:
-            data_to_upload = json.load(f)
-        compact_json = json.dumps(data_to_upload, separators=(",", ":"))
-    except json.JSONDecodeError as e:
+        with open(json_file_path, "rb") as f:
+            raw_json = f.read().strip()
+        if is_compact_json(raw_json):
+            # Already compact: send the file as is and only count its segments
+            compact_json = raw_json.decode("utf-8")
+            num_segments_expected = count_json_items(compact_json, "segments.item")
+        else:
+            data_to_upload = parse_json(raw_json)
+            compact_json = to_json(data_to_upload)
+            num_segments_expected = len(data_to_upload.get("segments", []))
+    except ValueError as e:  # Includes JSON and UTF-8 decoding errors
         print(f"  !! FAIL: Invalid JSON in '{json_file_path}': {e}")
         return False
 
     command = f"batchconfig {compact_json}"
-    send_command(ser, command)
-
-    print("  Verifying upload by checking status...")
-    response = send_command(ser, "getstatus")
+    if len(command) > MAX_COMMAND_LENGTH:
+        # Too long for the firmware's command line: send the JSON as a
+        # counted block after a short command line instead. The trailing
+        # newline send_command adds is an empty line to firmware that reads
+        # the block, and ends the JSON as (rejected) lines on firmware
+        # without 'batchconfigframed'.
+        length = len(compact_json.encode("utf-8"))
+        response = send_command(ser, f"batchconfigframed {length}\n{compact_json}")
+        if "Unknown command 'batchconfigframed'" in response:
+            # The JSON line is rejected too, split into as many commands as
+            # the line buffer needed; drain every rejection before moving on.
+            while read_all(ser):
+                pass
+            # A plain batchconfig would arrive truncated, so don't send one
+            print(
+                f"  !! FAIL: Firmware lacks 'batchconfigframed', and the config ({length} bytes) is too long for 'batchconfig'."
+            )
+            return False
+    else:
+        response = send_command(ser, command)
 
     try:
-        status_data = json.loads(response)
-        num_segments_expected = len(data_to_upload.get("segments", []))
-        num_segments_actual = len(status_data.get("segments", []))
+        applied = BATCH_APPLIED_RE.search(response)
+        if applied:
+            # The firmware reported the count itself; no getstatus needed
+            num_segments_actual = int(applied.group(1))
+        else:
+            print("  Verifying upload by checking status...")
+            response = send_command(ser, "getstatus")
+            # Only the segment count is needed, so don't build the whole status
+            num_segments_actual = count_json_items(response, "segments.item")
 
         assert num_segments_actual == num_segments_expected
         print("  -> PASS: 'batchconfig' seems to have worked. Segment count matches.")
         return True
-    except (json.JSONDecodeError, AssertionError) as e:
+    except (ValueError, AssertionError) as e:
         print(f"  !! FAIL: Verification failed. Error: {e}")
         return False
 
 
-def test_all_parameters_for_all_effects(ser, mode):
+def reported_param_values(info_resp):
+    """
+    Maps each parameter name in a 'geteffectinfo' response to the value the
+    device reports. Raises json.JSONDecodeError or KeyError if it can't be
+    parsed.
+    """
+    info = parse_json(info_resp)
+    return {p_info["name"]: p_info["value"] for p_info in info.get("params", [])}
+
+
+def param_test_value(param):
+    """
+    Picks the value a parameter is set to: the device's max for integer and
+    float params, a fixed color, or True. Returns (test_value, wire_value),
+    where wire_value is what set_parameter sends (colors as a hex string),
+    or None for a parameter type that isn't tested.
+    """
+    param_type = param["type"]
+    # Use the max value provided by the device for integer and float params
+    if param_type == "integer":
+        value = int(param.get("max_val", 255))
+    elif param_type == "float":
+        value = float(param.get("max_val", 1.0))
+    elif param_type == "color":
+        value = 0x123456  # Integer on the device, sent as a hex string
+        return value, f"0x{value:X}"
+    elif param_type == "boolean":
+        value = True
+    else:
+        return None
+    return value, value
+
+
+def effect_test_plan(effect_json, params_list):
+    """
+    Works out everything sent and checked for one effect's parameters before
+    any of it is sent: a (name, test value, wire value, printed value,
+    set_parameter command) tuple per tested parameter, in order.
+    """
+    plan = []
+    for param in params_list:
+        values = param_test_value(param)
+        if values is None:
+            continue
+        test_value, wire_value = values
+        # Colors print as the hex string they are sent as
+        print_val = wire_value if param["type"] == "color" else test_value
+        set_param_cmd = SET_PARAMETER_TEMPLATE % (
+            effect_json,
+            to_json(param["name"]),
+            to_json(wire_value),
+        )
+        plan.append((param["name"], test_value, wire_value, print_val, set_param_cmd))
+    return plan
+
+
+def setparams_commands(segment_id, wire_values):
+    """
+    Packs the (name, wire value) pairs into as few 'setparams' lines as the
+    firmware's command buffer and pair limit allow. Returns the lines, or
+    None if a single pair wouldn't fit.
+    """
+    prefix = f"setparams {segment_id}"
+    commands = []
+    command, pair_count = prefix, 0
+    for name, value in wire_values:
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        pair = f" {name} {value}"
+        if len(prefix) + len(pair) > MAX_COMMAND_LENGTH:
+            return None
+        if pair_count == SETPARAMS_MAX_PAIRS or len(command) + len(pair) > MAX_COMMAND_LENGTH:
+            commands.append(command)
+            command, pair_count = prefix, 0
+        command += pair
+        pair_count += 1
+    if pair_count:
+        commands.append(command)
+    return commands
+
+
+def test_effect_params_pipelined(ser, plan):
+    """
+    Automatic-mode check of one effect's effect_test_plan: sets every
+    parameter with as few 'setparams' commands as fit (or, on firmware
+    without it, writes every set_parameter command in one go and collects
+    their replies), then verifies all the values with a single
+    'geteffectinfo 0', pipelined behind the sets, instead of one round-trip
+    pair per parameter.
+    """
+    effect_passed = True
+    expected = {}  # Parameter name -> value the device should now report
+    wire_values = []
+    commands = []
+    for param_name, test_value, wire_value, print_val, set_param_cmd in plan:
+        print(f"      Adjusting param '{param_name}' to '{print_val}'...")
+        expected[param_name] = test_value
+        wire_values.append((param_name, wire_value))
+        commands.append(set_param_cmd)
+
+    # 'geteffectinfo 0' rides in the same pipeline as the sets, so the device
+    # answers it while the set replies are still being read. The firmware
+    # applies each setparams line all-or-nothing, so any error (including an
+    # unknown command on older builds) falls back to one command per
+    # parameter to find out which ones fail.
+    if not commands:
+        return effect_passed
+    fused = setparams_commands(0, wire_values)
+    if fused:
+        responses = send_pipeline(ser, fused + ["geteffectinfo 0"])
+        info_resp = responses.pop()
+    if fused and all(OK_LINE_RE.search(r) for r in responses):
+        responses = ["OK"] * len(commands)
+    else:
+        responses = send_pipeline(ser, commands + ["geteffectinfo 0"])
+        info_resp = responses.pop()
+    for param_name, response in zip(list(expected), responses):
+        if not OK_LINE_RE.search(response):
+            effect_passed = False
+            del expected[param_name]  # Nothing to verify for this one
+            print(
+                f"      !! AUTO-FAIL: Command to set '{param_name}' was not acknowledged. Response: {response}"
+            )
+    if not expected:
+        return effect_passed
+
+    try:
+        reported = reported_param_values(info_resp)
+    except (json.JSONDecodeError, KeyError) as e:
+        print(f"      !! AUTO-FAIL: Could not parse geteffectinfo. Error: {e}")
+        return False
+    for param_name, test_value in expected.items():
+        if reported.get(param_name) != test_value:
+            effect_passed = False
+            print(f"      !! AUTO-FAIL: Verification for '{param_name}' failed. Sent {test_value}, but device reports another value.")
+    return effect_passed
+
+
+def test_all_parameters_for_all_effects(ser, mode, effects_cache=None, results_log=None):
     """
     Discovers all effects, then discovers, adjusts, and verifies every parameter 
     of each effect, either automatically or with manual confirmation.
+    With effects_cache, parameter lists are read from and saved to that file,
+    keyed by the device's effect list, so repeat runs skip 'get_parameters'.
+    With results_log, each effect's result is appended to that file as one
+    JSON line as soon as it is known, and effects it records as passing in
+    the same mode are skipped, so an interrupted run can pick up where it
+    stopped.
     """
     print(f"\n## Running Parameter Validation (Mode: {mode.upper()})... ##")
 
@@ -239,65 +791,66 @@ def test_all_parameters_for_all_effects(ser, mode):
     print("\n1. Discovering effects with 'listeffects'...")
     response = send_command(ser, "listeffects")
     try:
-        effects_to_test = json.loads(response)["effects"]
+        effects_to_test = parse_json(response)["effects"]
         print(f"   Found {len(effects_to_test)} effects to test.")
     except (json.JSONDecodeError, KeyError):
         print("  !! FATAL: Could not parse effect list. Aborting.")
         return False
 
+    if effects_cache:
+        firmware_key = hashlib.sha1(response.encode("utf-8")).hexdigest()
+        cache_data = load_effect_params_cache(effects_cache, firmware_key)
+
+    passed_before = set()
+    results_file = None
+    if results_log:
+        passed_before = load_passed_effects(results_log, mode)
+        results_file = open(results_log, "a", buffering=1)  # Line-buffered
+
     # 2. Loop and validate each effect's parameters
     print("\n2. Discovering and testing parameters for each effect...")
     overall_results = {}
 
-    for effect_name in effects_to_test:
-        print(f"\n--- Testing Effect: {effect_name} ---")
+    try:
+        for effect_name in effects_to_test:
+            if effect_name in passed_before:
+                print(f"\n--- Skipping Effect: {effect_name} (passed in an earlier run) ---")
+                overall_results[effect_name] = True
+                continue
+
+            print(f"\n--- Testing Effect: {effect_name} ---")
 
-        get_params_cmd = {"get_parameters": effect_name}
-        params_response = send_command(ser, get_params_cmd, quiet=True)
+            effect_json = to_json(effect_name)  # Shared by every command below
 
-        try:
-            params_list = json.loads(params_response)["params"]
-        except (json.JSONDecodeError, KeyError):
-            print(f"  !! FAIL: Could not get parameters for '{effect_name}'.")
-            overall_results[effect_name] = False
-            continue
+            try:
+                params_list = get_effect_params(ser, effect_name, effect_json)
+            except (ValueError, KeyError):
+                print(f"  !! FAIL: Could not get parameters for '{effect_name}'.")
+                overall_results[effect_name] = False
+                continue
+
+            print(f"  Found {len(params_list)} parameters to test for '{effect_name}'.")
+            effect_passed = True
+            visual_log = []  # Parameters awaiting visual confirmation
+
+            plan = effect_test_plan(effect_json, params_list)
+            send_command(ser, f"seteffect 0 {effect_name}", quiet=True)
 
-        print(f"  Found {len(params_list)} parameters to test for '{effect_name}'.")
-        effect_passed = True
-
-        send_command(ser, f"seteffect 0 {effect_name}", quiet=True)
-
-        for param in params_list:
-            param_name = param["name"]
-            param_type = param["type"]
-            
-            test_value = None
-            # Use the max value provided by the device for integer and float params
-            if param_type == "integer": test_value = int(param.get("max_val", 255))
-            elif param_type == "float": test_value = float(param.get("max_val", 1.0))
-            elif param_type == "color": test_value = 0x123456 # Use integer for color
-            elif param_type == "boolean": test_value = True
-
-            if test_value is not None:
-                # Convert to hex string for printing, if it's a color
-                print_val = f"0x{test_value:X}" if param_type == 'color' else test_value
-                print(
-                    f"      Adjusting param '{param_name}' to '{print_val}'..."
+            # Without a human in the loop, the parameters don't need to be set
+            # one at a time
+            if mode == 'automatic':
+                overall_results[effect_name] = test_effect_params_pipelined(ser, plan)
+                record_effect_result(
+                    results_file, effect_name, mode, overall_results[effect_name]
                 )
-                
-                # Use string version of color for the JSON command
-                set_param_value = f"0x{test_value:X}" if param_type == 'color' else test_value
-                set_param_cmd = {
-                    "set_parameter": {
-                        "segment_id": 0,
-                        "effect": effect_name,
-                        "name": param_name,
-                        "value": set_param_value,
-                    }
-                }
+                sys.stdout.flush()
+                continue
+
+            for param_name, test_value, _, print_val, set_param_cmd in plan:
+                print(f"      Adjusting param '{param_name}' to '{print_val}'...")
                 response = send_command(ser, set_param_cmd, quiet=True)
 
-                if "OK" not in response:
+                if not OK_LINE_RE.search(response):
                     effect_passed = False
                     print(
                         f"      !! AUTO-FAIL: Command to set '{param_name}' was not acknowledged. Response: {response}"
@@ -307,36 +860,61 @@ def test_all_parameters_for_all_effects(ser, mode):
                 # Automatic verification
                 info_resp = send_command(ser, f"geteffectinfo 0", quiet=True)
                 try:
-                    info = json.loads(info_resp)
-                    param_verified = False
-                    for p_info in info.get("params", []):
-                        if p_info["name"] == param_name:
-                            if p_info["value"] == test_value:
-                                param_verified = True
-                                break
-                    if not param_verified:
+                    if reported_param_values(info_resp).get(param_name) != test_value:
                         effect_passed = False
                         print(f"      !! AUTO-FAIL: Verification for '{param_name}' failed. Sent {test_value}, but device reports another value.")
                 except (json.JSONDecodeError, KeyError) as e:
                     effect_passed = False
                     print(f"      !! AUTO-FAIL: Could not parse geteffectinfo. Error: {e}")
 
-                # Manual (visual) verification if in manual mode and auto check passed
+                # Visual checks wait for one prompt at the end of the effect
                 if mode == 'manual' and effect_passed:
-                    ans = (
-                        input(
-                            f"      --> Please visually confirm: Did the '{param_name}' parameter change? (y/n): "
-                        )
-                        .strip()
-                        .lower()
+                    visual_log.append(param_name)
+
+            # Manual (visual) verification of every parameter that passed the
+            # automatic check, with one prompt per effect
+            if visual_log:
+                ans = (
+                    input(
+                        f"      --> Please visually confirm: Did all {len(visual_log)} parameters of '{effect_name}' change? (y/n/f=name failures): "
                     )
-                    if ans != "y":
-                        effect_passed = False
-                        print(
-                            f"      !! MANUAL-FAIL: Visual confirmation failed for '{param_name}'."
+                    .strip()
+                    .lower()
+                )
+                if ans == "f":
+                    # Re-prompt until at least one name is given and every name
+                    # is one of this effect's checked parameters
+                    while True:
+                        failed_names = input(
+                            f"      --> Parameters that did not change ({', '.join(visual_log)}), comma-separated: "
                         )
+                        failed = [name.strip() for name in failed_names.split(",") if name.strip()]
+                        unknown = [name for name in failed if name not in visual_log]
+                        if failed and not unknown:
+                            break
+                        if unknown:
+                            print(f"      Unknown parameter(s): {', '.join(unknown)}. Please try again.")
+                        else:
+                            print("      Enter at least one parameter name. Please try again.")
+                elif ans != "y":
+                    failed = visual_log
+                else:
+                    failed = []
+                for param_name in failed:
+                    effect_passed = False
+                    print(
+                        f"      !! MANUAL-FAIL: Visual confirmation failed for '{param_name}'."
+                    )
 
-        overall_results[effect_name] = effect_passed
+            overall_results[effect_name] = effect_passed
+            record_effect_result(results_file, effect_name, mode, effect_passed)
+            sys.stdout.flush()  # Show each effect's log as it completes
+    finally:
+        if results_file:
+            results_file.close()
+
+    if effects_cache:
+        save_effect_params_cache(effects_cache, firmware_key, cache_data)
 
     # Final summary
     print("\n\n--- Automated Parameter Test Summary ---")
@@ -349,21 +927,29 @@ def test_all_parameters_for_all_effects(ser, mode):
     return all_passed
 
 
-def run_all_tests(port, baud, json_config, mode):
-    """Main function to run the full test suite."""
+def run_all_tests(port, baud, json_config, mode, effects_cache=None, results_log=None):
+    """Main function to run the full test suite. Returns True if every test passed."""
     print(f"Opening serial port {port} @ {baud} baud")
     try:
         ser = serial.Serial(port, baud, timeout=DELAY)
-        
+        enable_low_latency(ser)
+
         if not wait_for_device_ready(ser):
-             sys.exit(1)
+            return False
 
         # Run all major test functions
+        # Output is block-buffered (see __main__), so flush after each test
         std_ok = test_standard_commands(ser)
+        sys.stdout.flush()
         led_count_ok = test_led_count_commands(ser)
+        sys.stdout.flush()
         config_ok = test_config_persistence(ser)
+        sys.stdout.flush()
         json_ok = test_json_upload(ser, json_config)
-        params_ok = test_all_parameters_for_all_effects(ser, mode)
+        sys.stdout.flush()
+        params_ok = test_all_parameters_for_all_effects(
+            ser, mode, effects_cache, results_log
+        )
 
         print("\n\n--- FINAL TEST SUMMARY ---")
         print(f"  Standard Commands:       {'PASS' if std_ok else 'FAIL'}")
@@ -374,15 +960,16 @@ def run_all_tests(port, baud, json_config, mode):
 
         if std_ok and led_count_ok and config_ok and json_ok and params_ok:
             print("\n🎉 All tests passed successfully! 🎉")
-        else:
-            print("\n❌ Some tests failed. Please review the log. ❌")
+            return True
+        print("\n❌ Some tests failed. Please review the log. ❌")
+        return False
 
     except serial.SerialException as e:
         print(f"\nFATAL: Error opening serial port {port}: {e}")
-        sys.exit(1)
+        return False
     except Exception as e:
         print(f"\nAn unexpected error occurred: {e}")
-        sys.exit(1)
+        return False
     finally:
         if 'ser' in locals() and ser.is_open:
             ser.close()
@@ -393,7 +980,10 @@ if __name__ == "__main__":
         description="Comprehensive and interactive test suite for RaveController_v1."
     )
     parser.add_argument(
-        "--port", required=True, help="Serial port (e.g., COM7 or /dev/ttyACM0)"
+        "--port",
+        required=True,
+        nargs="+",
+        help="Serial port (e.g., COM7 or /dev/ttyACM0); give several to test devices in parallel (automatic mode only)",
     )
     parser.add_argument(
         "--baud", type=int, default=BAUD, help=f"Baud rate (default: {BAUD})"
@@ -409,5 +999,63 @@ if __name__ == "__main__":
         default='manual',
         help="Set parameter testing mode: 'automatic' for silent verification, 'manual' for visual confirmation."
     )
+    parser.add_argument(
+        "--effects-cache",
+        nargs="?",
+        const=DEFAULT_EFFECTS_CACHE,
+        help=f"File to remember effect parameters in between runs (default when given without a path: {DEFAULT_EFFECTS_CACHE}); delete it after changing an effect's parameters.",
+    )
+    parser.add_argument(
+        "--results-log",
+        help="File to append each effect's parameter test result to; effects it records as passed are skipped on the next run.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Don't print every command and response; test results and failures are still shown.",
+    )
     args = parser.parse_args()
-    run_all_tests(args.port, args.baud, args.json_config, args.mode)
\ No newline at end of file
+    if args.mode == 'manual' and len(args.port) > 1:
+        parser.error("manual mode confirms one device at a time; use --mode automatic with several ports")
+    QUIET = args.quiet
+    # A terminal would otherwise flush stdout on every line of every command's
+    # exchange; the tests flush at phase and effect boundaries instead, and
+    # input() flushes before each prompt.
+    if sys.stdout.isatty():
+        sys.stdout.reconfigure(line_buffering=False)
+    if len(args.port) == 1:
+        all_ok = run_all_tests(
+            args.port[0],
+            args.baud,
+            args.json_config,
+            args.mode,
+            args.effects_cache,
+            args.results_log,
+        )
+    else:
+        # Each device is limited by its own serial round-trips, so test them
+        # in separate processes. Every port gets its own results log, and
+        # its output lines are prefixed with the port.
+        sys.stdout.flush()  # Forked workers would repeat anything buffered
+        with ProcessPoolExecutor(
+            max_workers=len(args.port), initializer=set_quiet, initargs=(QUIET,)
+        ) as pool:
+            futures = {
+                port: pool.submit(
+                    run_port_tests,
+                    port,
+                    args.baud,
+                    args.json_config,
+                    args.mode,
+                    args.effects_cache,
+                    args.results_log
+                    and f"{args.results_log}.{os.path.basename(port)}",
+                )
+                for port in args.port
+            }
+            results = {port: future.result() for port, future in futures.items()}
+        print("\n\n--- PER-DEVICE SUMMARY ---")
+        for port, passed in results.items():
+            print(f"  {port:20s} {'PASS' if passed else 'FAIL'}")
+        all_ok = all(results.values())
+    sys.exit(0 if all_ok else 1)
\ No newline at end of file
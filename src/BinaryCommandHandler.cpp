@@ -126,6 +126,12 @@ void BinaryCommandHandler::handleCommand(const uint8_t *data, size_t len)
         processIncomingAllSegmentsData(data, len);
         return;
     }
+    if (_incomingBatchState == IncomingBatchState::EXPECTING_FRAMED_COUNT ||
+        _incomingBatchState == IncomingBatchState::EXPECTING_FRAMED_SEGMENTS)
+    {
+        processFramedSegmentsData(data, len);
+        return;
+    }
 
     // Process new commands
     BleCommand cmd = (BleCommand)data[0];
@@ -222,6 +228,23 @@ void BinaryCommandHandler::handleSetAllSegmentConfigsCommand(bool viaSerial)
     Serial.println("-> Sent ACK for CMD_SET_ALL_SEGMENT_CONFIGS initiation.");
 }
 
+void BinaryCommandHandler::handleSetAllSegmentConfigsFramed(bool viaSerial)
+{
+    _isSerialBatch = viaSerial;
+    Serial.println("CMD: Set All Segment Configurations (framed) - Initiated.");
+    if (strip)
+    {
+        strip->clearUserSegments();
+        Serial.println("OK: Cleared existing user segments.");
+    }
+    _incomingBatchState = IncomingBatchState::EXPECTING_FRAMED_COUNT;
+    _jsonBufferIndex = 0;
+    memset(_incomingJsonBuffer, 0, sizeof(_incomingJsonBuffer));
+    _expectedSegmentsToReceive = 0;
+    _segmentsReceivedInBatch = 0;
+    Serial.println("-> Ready for framed segment data.");
+}
+
 void BinaryCommandHandler::handleGetAllEffectsCommand(bool viaSerial)
 {
     _isSerialBatch = viaSerial;
@@ -331,6 +354,75 @@ void BinaryCommandHandler::processIncomingAllSegmentsData(const uint8_t *data, s
     }
 }
 
+void BinaryCommandHandler::processFramedSegmentsData(const uint8_t *data, size_t len)
+{
+    // Append new data to the buffer, checking for overflow
+    if (_jsonBufferIndex + len >= sizeof(_incomingJsonBuffer))
+    {
+        Serial.println("ERR: JSON buffer overflow!");
+        _incomingBatchState = IncomingBatchState::IDLE;
+        _jsonBufferIndex = 0;
+        memset(_incomingJsonBuffer, 0, sizeof(_incomingJsonBuffer));
+        return;
+    }
+    memcpy(_incomingJsonBuffer + _jsonBufferIndex, data, len);
+    _jsonBufferIndex += len;
+    _incomingJsonBuffer[_jsonBufferIndex] = '\0'; // Ensure null termination
+
+    // Consume every complete field in the buffer; a partial frame waits for more data.
+    size_t pos = 0;
+    while (true)
+    {
+        size_t available = _jsonBufferIndex - pos;
+        if (_incomingBatchState == IncomingBatchState::EXPECTING_FRAMED_COUNT)
+        {
+            if (available < 2)
+                break;
+            _expectedSegmentsToReceive = ((uint8_t)_incomingJsonBuffer[pos] << 8) | (uint8_t)_incomingJsonBuffer[pos + 1];
+            pos += 2;
+            Serial.print("Expected segments to receive: ");
+            Serial.println(_expectedSegmentsToReceive);
+            _segmentsReceivedInBatch = 0;
+            _incomingBatchState = IncomingBatchState::EXPECTING_FRAMED_SEGMENTS;
+            continue;
+        }
+
+        if (_segmentsReceivedInBatch >= _expectedSegmentsToReceive)
+        {
+            uint8_t ack_payload[] = {(uint8_t)CMD_ACK_GENERIC};
+            BLEManager::getInstance().sendMessage(ack_payload, 1);
+            Serial.println("OK: All segment configurations received and applied.");
+            _incomingBatchState = IncomingBatchState::IDLE;
+            _jsonBufferIndex = 0;
+            memset(_incomingJsonBuffer, 0, sizeof(_incomingJsonBuffer));
+            strip->show(); // Update strip after all segments are applied
+            return;
+        }
+
+        if (available < 2)
+            break;
+        size_t frameLen = ((uint8_t)_incomingJsonBuffer[pos] << 8) | (uint8_t)_incomingJsonBuffer[pos + 1];
+        if (available - 2 < frameLen)
+            break;
+
+        // Temporarily null-terminate the frame's JSON for parsing
+        char *json = _incomingJsonBuffer + pos + 2;
+        char original_char_after_end = json[frameLen];
+        json[frameLen] = '\0';
+        processSingleSegmentJson(json);
+        json[frameLen] = original_char_after_end;
+
+        pos += 2 + frameLen;
+        _segmentsReceivedInBatch++;
+    }
+
+    // Keep the unconsumed tail (a partial field) at the start of the buffer
+    size_t remaining_len = _jsonBufferIndex - pos;
+    memmove(_incomingJsonBuffer, _incomingJsonBuffer + pos, remaining_len);
+    _jsonBufferIndex = remaining_len;
+    _incomingJsonBuffer[_jsonBufferIndex] = '\0';
+}
+
 IncomingBatchState BinaryCommandHandler::getIncomingBatchState() const
 {
     return _incomingBatchState;
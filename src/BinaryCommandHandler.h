@@ -36,6 +36,8 @@ enum class IncomingBatchState
     // Removed EXPECTING_BATCH_CONFIG_JSON as it's no longer used.
     EXPECTING_ALL_SEGMENTS_COUNT, ///< Expecting the total count of segments for a batch update.
     EXPECTING_ALL_SEGMENTS_JSON,  ///< Expecting individual segment JSON payloads.
+    EXPECTING_FRAMED_COUNT,       ///< Expecting the segment count of a length-prefixed batch.
+    EXPECTING_FRAMED_SEGMENTS,    ///< Expecting length-prefixed segment JSONs, acknowledged once at the end.
     EXPECTING_EFFECT_ACK,         ///< Waiting for an ACK before sending the next effect's info.
     EXPECTING_SEGMENT_ACK         ///< Waiting for an ACK before sending the next segment's info.
 };
@@ -75,6 +77,14 @@ public:
      */
     void handleSetAllSegmentConfigsCommand(bool viaSerial);
 
+    /**
+     * @brief Initiates receiving all segment configurations as one length-prefixed stream.
+     * The stream is a 2-byte big-endian segment count followed by, per segment, a 2-byte
+     * big-endian length and that many bytes of JSON. Only the completed batch is acknowledged.
+     * @param viaSerial If true, expects input from Serial; otherwise, expects from BLE.
+     */
+    void handleSetAllSegmentConfigsFramed(bool viaSerial);
+
     /**
      * @brief Initiates the process of sending information for all available effects.
      * @param viaSerial If true, sends output to Serial; otherwise, sends via BLE.
@@ -161,6 +171,13 @@ private:
      */
     void processIncomingAllSegmentsData(const uint8_t *data, size_t len);
 
+    /**
+     * @brief Processes incoming data for a length-prefixed segment batch.
+     * @param data Pointer to the incoming data.
+     * @param len Length of the data.
+     */
+    void processFramedSegmentsData(const uint8_t *data, size_t len);
+
     /**
      * @brief Handles the reception of an ACK.
      */
@@ -188,7 +188,11 @@ void handleBatchConfigJson(const char* json)
             }
         }
         strip->show();
-        Serial.println("OK: Batch configuration applied.");
+        // Echo the resulting segment count so hosts can check the upload
+        // without a follow-up getstatus
+        Serial.print("OK: Batch configuration applied (");
+        Serial.print(strip->getSegments().size());
+        Serial.println(" segments).");
         bleManager.sendMessage("{\"status\":\"OK\"}");
     }
 }
\ No newline at end of file
@@ -30,6 +30,8 @@ void SerialCommandHandler::handleCommand(char *command)
 
     if (strcmp(cmd, "help") == 0)
         handleHelp();
+    else if (strcmp(cmd, "ping") == 0)
+        Serial.println("OK: pong");
     else if (strcmp(cmd, "listeffects") == 0)
         handleListEffects();
     else if (strcmp(cmd, "getstatus") == 0)
@@ -50,22 +52,30 @@ void SerialCommandHandler::handleCommand(char *command)
         handleClearSegments();
     else if (strcmp(cmd, "addsegment") == 0)
         handleAddSegment(args);
+    else if (strcmp(cmd, "rainbowchase") == 0)
+        handleRainbowChase(args);
     else if (strcmp(cmd, "seteffect") == 0)
         handleSetEffect(args);
     else if (strcmp(cmd, "geteffectinfo") == 0)
         handleGetEffectInfo(args);
     else if (strcmp(cmd, "setparameter") == 0 || strcmp(cmd, "setparam") == 0)
         handleSetParameter(args);
+    else if (strcmp(cmd, "setparams") == 0)
+        handleSetParameters(args);
     else if (strcmp(cmd, "getparams") == 0)
         handleGetParameters(args);
     else if (strcmp(cmd, "batchconfig") == 0)
         handleBatchConfig(args);
+    else if (strcmp(cmd, "batchconfigframed") == 0)
+        handleBatchConfigFramed(args);
     else if (strcmp(cmd, "getallsegmentconfigs") == 0)
         handleGetAllSegmentConfigsSerial();
     else if (strcmp(cmd, "getalleffects") == 0)
         handleGetAllEffectsSerial();
     else if (strcmp(cmd, "setallsegmentconfigs") == 0)
         handleSetAllSegmentConfigsSerial();
+    else if (strcmp(cmd, "setallsegmentsframed") == 0)
+        handleSetAllSegmentsFramedSerial();
     else if (strcmp(cmd, "setsegmentjson") == 0)
         handleSetSingleSegmentJson(args);
     else if (strcmp(cmd, "blestatus") == 0)
@@ -141,6 +151,7 @@ void SerialCommandHandler::handleHelp()
     Serial.println("Commands are not case-sensitive. Arguments are separated by spaces.");
     Serial.println("\n[General Commands]");
     Serial.println("  help                         - Shows this help message.");
+    Serial.println("  ping                         - Replies 'OK: pong' once the sketch is accepting commands.");
     Serial.println("  getstatus                    - Prints the current status of the device as JSON.");
     Serial.println("  getcurrconfig                - Prints the current configuration in memory");
     Serial.println("  getsavedconfig               - Prints the saved configuration from the filesystem.");
@@ -153,6 +164,8 @@ void SerialCommandHandler::handleHelp()
     Serial.println("  clearsegments                - Deletes all user-defined segments.");
     Serial.println("  addsegment <start> <end> [name]");
     Serial.println("                               - Adds a new segment.");
+    Serial.println("  rainbowchase <count> <leds_per_seg> [brightness] [speed]");
+    Serial.println("                               - Replaces user segments with equal RainbowChase segments.");
     Serial.println("  setsegmentjson <json>        - Configures a single segment using a JSON string.");
     Serial.println("\n[Effect & Parameter Control]");
     Serial.println("  listeffects                  - Lists all available effects.");
@@ -161,15 +174,19 @@ void SerialCommandHandler::handleHelp()
     Serial.println("                               - Gets parameter info for an effect.");
     Serial.println("  setparam <seg_id> <param> <value>");
     Serial.println("                               - Sets a parameter for the active effect on a segment.");
+    Serial.println("  setparams <seg_id> <param> <value> [<param> <value> ...]");
+    Serial.println("                               - Sets several parameters at once; none are set if any is invalid.");
     Serial.println("  getparams <seg_id>           - Gets parameters for the active effect on a segment.");
     Serial.println("\n[Bluetooth Commands]");
     Serial.println("  blestatus                    - Checks the current Bluetooth connection status.");
     Serial.println("  blereset                     - Resets the Bluetooth module.");
     Serial.println("\n[Advanced/Batch Commands]");
     Serial.println("  batchconfig <json>           - Applies a full configuration from a JSON string.");
+    Serial.println("  batchconfigframed <length>   - Same, with the JSON sent as <length> raw bytes after the line.");
     Serial.println("  getallsegmentconfigs         - Gets the full configuration of all segments as JSON.");
     Serial.println("  getalleffects                - Gets detailed information for all effects as JSON.");
     Serial.println("  setallsegmentconfigs         - Initiates receiving segment configurations.");
+    Serial.println("  setallsegmentsframed         - Same, as one length-prefixed stream with a single final ACK.");
     Serial.println("--- End of Help ---\n");
 }
 
@@ -332,6 +349,55 @@ void SerialCommandHandler::handleAddSegment(char *args)
     }
 }
 
+void SerialCommandHandler::handleRainbowChase(char *args)
+{
+    if (!args)
+    {
+        Serial.println("ERR: Missing arguments for rainbowchase.");
+        return;
+    }
+
+    char *saveptr;
+    char *countStr = strtok_r(args, " ", &saveptr);
+    char *lengthStr = strtok_r(NULL, " ", &saveptr);
+    char *brightnessStr = strtok_r(NULL, " ", &saveptr);
+    char *speedStr = strtok_r(NULL, " ", &saveptr);
+
+    int count = countStr ? atoi(countStr) : 0;
+    int length = lengthStr ? atoi(lengthStr) : 0;
+    if (count <= 0 || length <= 0)
+    {
+        Serial.println("ERR: Invalid arguments. Use: rainbowchase <count> <leds_per_seg> [brightness] [speed]");
+        return;
+    }
+    if (!strip)
+    {
+        Serial.println("ERR: Strip not initialized.");
+        return;
+    }
+
+    uint8_t brightness = brightnessStr ? (uint8_t)atoi(brightnessStr) : 200;
+    int speed = speedStr ? atoi(speedStr) : 30;
+
+    // Expand the layout here so the host sends one line instead of a JSON
+    // object per segment that differs only in id and LED range.
+    strip->clearUserSegments();
+    for (int i = 0; i < count; ++i)
+    {
+        int start = i * length;
+        strip->addSection(start, start + length - 1, "rc_segment_" + String(i + 1));
+        PixelStrip::Segment *seg = strip->getSegments().back();
+        seg->setBrightness(brightness);
+        seg->activeEffect = createEffectByName("RainbowChase", seg);
+        if (seg->activeEffect)
+            seg->activeEffect->setParameter("speed", speed);
+    }
+
+    Serial.print("OK: ");
+    Serial.print(count);
+    Serial.println(" RainbowChase segments configured.");
+}
+
 void SerialCommandHandler::handleSetEffect(char *args)
 {
     if (!args)
@@ -451,6 +517,41 @@ void SerialCommandHandler::handleGetEffectInfo(char *args)
     Serial.println();
     delete tempEffect;
 }
+
+// --- Parameter Helpers ---
+
+// Looks up a parameter of the effect by name, ignoring case
+static EffectParameter *findParameter(BaseEffect *effect, const char *name)
+{
+    for (int i = 0; i < effect->getParameterCount(); ++i)
+    {
+        EffectParameter *p = effect->getParameter(i);
+        if (strcasecmp(name, p->name) == 0)
+            return p;
+    }
+    return nullptr;
+}
+
+// Parses valueStr according to the parameter's type and applies it
+static void applyParameterValue(BaseEffect *effect, EffectParameter *p, const char *valueStr)
+{
+    switch (p->type)
+    {
+    case ParamType::INTEGER:
+        effect->setParameter(p->name, (int)atol(valueStr));
+        break;
+    case ParamType::FLOAT:
+        effect->setParameter(p->name, (float)atof(valueStr));
+        break;
+    case ParamType::COLOR:
+        effect->setParameter(p->name, (uint32_t)strtoul(valueStr, NULL, 0));
+        break;
+    case ParamType::BOOLEAN:
+        effect->setParameter(p->name, (bool)(strcmp(valueStr, "true") == 0 || atoi(valueStr) != 0));
+        break;
+    }
+}
+
 void SerialCommandHandler::handleSetParameter(char *args)
 {
     if (!args)
@@ -484,39 +585,86 @@ void SerialCommandHandler::handleSetParameter(char *args)
         return;
     }
 
-    EffectParameter *p = nullptr;
-    for (int i = 0; i < seg->activeEffect->getParameterCount(); ++i)
+    EffectParameter *p = findParameter(seg->activeEffect, paramName);
+    if (p == nullptr)
     {
-        EffectParameter *currentParam = seg->activeEffect->getParameter(i);
-        if (strcasecmp(paramName, currentParam->name) == 0)
-        {
-            p = currentParam;
-            break;
-        }
+        Serial.println("ERR: Parameter not found on active effect.");
+        return;
     }
 
-    if (p == nullptr)
+    applyParameterValue(seg->activeEffect, p, valueStr);
+    Serial.println("OK: Parameter set.");
+}
+
+void SerialCommandHandler::handleSetParameters(char *args)
+{
+    if (!args)
     {
-        Serial.println("ERR: Parameter not found on active effect.");
+        Serial.println("ERR: Missing arguments for setparams.");
         return;
     }
 
-    switch (p->type)
+    char *saveptr;
+    char *segIndexStr = strtok_r(args, " ", &saveptr);
+    int segIndex = segIndexStr ? atoi(segIndexStr) : -1;
+    if (!strip || segIndex < 0 || segIndex >= (int)strip->getSegments().size())
     {
-    case ParamType::INTEGER:
-        seg->activeEffect->setParameter(p->name, (int)atol(valueStr));
-        break;
-    case ParamType::FLOAT:
-        seg->activeEffect->setParameter(p->name, (float)atof(valueStr));
-        break;
-    case ParamType::COLOR:
-        seg->activeEffect->setParameter(p->name, (uint32_t)strtoul(valueStr, NULL, 0));
-        break;
-    case ParamType::BOOLEAN:
-        seg->activeEffect->setParameter(p->name, (bool)(strcmp(valueStr, "true") == 0 || atoi(valueStr) != 0));
-        break;
+        Serial.println("ERR: Invalid segment index.");
+        return;
     }
-    Serial.println("OK: Parameter set.");
+
+    PixelStrip::Segment *seg = strip->getSegments()[segIndex];
+    if (!seg->activeEffect)
+    {
+        Serial.println("ERR: No active effect on segment.");
+        return;
+    }
+
+    // Resolve every pair before applying any, so a bad name or a missing
+    // value leaves the effect untouched.
+    const int maxPairs = 16;
+    EffectParameter *params[maxPairs];
+    const char *values[maxPairs];
+    int count = 0;
+    char *paramName;
+    while ((paramName = strtok_r(NULL, " ", &saveptr)) != NULL)
+    {
+        char *valueStr = strtok_r(NULL, " ", &saveptr);
+        if (!valueStr)
+        {
+            Serial.print("ERR: Missing value for parameter '");
+            Serial.print(paramName);
+            Serial.println("'.");
+            return;
+        }
+        if (count >= maxPairs)
+        {
+            Serial.println("ERR: Too many parameters in one setparams.");
+            return;
+        }
+        EffectParameter *p = findParameter(seg->activeEffect, paramName);
+        if (p == nullptr)
+        {
+            Serial.print("ERR: Parameter '");
+            Serial.print(paramName);
+            Serial.println("' not found on active effect.");
+            return;
+        }
+        params[count] = p;
+        values[count] = valueStr;
+        count++;
+    }
+    if (count == 0)
+    {
+        Serial.println("ERR: Invalid arguments. Use: setparams <seg_id> <param> <value> [<param> <value> ...]");
+        return;
+    }
+
+    for (int i = 0; i < count; ++i)
+        applyParameterValue(seg->activeEffect, params[i], values[i]);
+    Serial.print("OK: ");
+    Serial.print(count);
+    Serial.println(" parameters set.");
 }
 
 void SerialCommandHandler::handleGetParameters(const char *args)
@@ -535,6 +683,34 @@ void SerialCommandHandler::handleBatchConfig(const char *json)
     handleBatchConfigJson(json);
 }
 
+void SerialCommandHandler::handleBatchConfigFramed(const char *args)
+{
+    // The JSON follows the command line as exactly <length> bytes, so it
+    // isn't limited by the command line buffer and needs no newline scan.
+    static char jsonBuffer[2048];
+    int length = args ? atoi(args) : 0;
+    if (length <= 0 || length >= (int)sizeof(jsonBuffer))
+    {
+        Serial.print("ERR: Invalid length. Use: batchconfigframed <1-");
+        Serial.print(sizeof(jsonBuffer) - 1);
+        Serial.println(">");
+        return;
+    }
+
+    size_t received = Serial.readBytes(jsonBuffer, length);
+    if (received < (size_t)length)
+    {
+        Serial.print("ERR: Timed out after ");
+        Serial.print(received);
+        Serial.print(" of ");
+        Serial.print(length);
+        Serial.println(" JSON bytes.");
+        return;
+    }
+    jsonBuffer[length] = '\0';
+    handleBatchConfigJson(jsonBuffer);
+}
+
 void SerialCommandHandler::handleSetSingleSegmentJson(const char *json)
 {
     binaryCommandHandler.processSingleSegmentJson(json);
@@ -555,6 +731,11 @@ void SerialCommandHandler::handleSetAllSegmentConfigsSerial()
     binaryCommandHandler.handleSetAllSegmentConfigsCommand(true);
 }
 
+void SerialCommandHandler::handleSetAllSegmentsFramedSerial()
+{
+    binaryCommandHandler.handleSetAllSegmentConfigsFramed(true);
+}
+
 void SerialCommandHandler::handleBleReset()
 {
     Serial.println("Initiating BLE reset from serial command...");
@@ -36,10 +36,13 @@ private:
     void handleListSegments();
     void handleClearSegments();
     void handleAddSegment(char* args);
+    void handleRainbowChase(char* args);
     void handleSetEffect(char* args);
     void handleGetEffectInfo(char* args);
     void handleSetParameter(char* args);
+    void handleSetParameters(char* args);
     void handleBatchConfig(const char* json);
+    void handleBatchConfigFramed(const char* args);
     void handleBleReset();
     void handleBleStatus();
     void handleHelp();
@@ -47,6 +50,7 @@ private:
     void handleGetAllSegmentConfigsSerial();
     void handleGetAllEffectsSerial();
     void handleSetAllSegmentConfigsSerial();
+    void handleSetAllSegmentsFramedSerial();
 
     void handleGetParameters(const char* args);
     void handleSetSingleSegmentJson(const char* json);